@@ -35,12 +35,21 @@
 # Python 2.X code using the library usu. needs to include the next line:
 
 from serial import Serial
-import time
+from collections import namedtuple
+import bisect
+from .flowcontrol import FlowControl
+from .dither import image_dots
+import numpy as np
 import sys
 
+# What estimateBitmap and estimateImage predict a print sends and
+# takes: serial bytes, dots heated, bitmap rows printed, blank rows
+# fed and seconds.
+PrintEstimate = namedtuple('PrintEstimate',
+  ['bytes', 'dots', 'printed_rows', 'fed_rows', 'seconds'])
+
 class Adafruit_Thermal(Serial):
 
-	resumeTime      =   0.0
 	byteTime        =   0.0
 	dotPrintTime    =   0.03
 	dotFeedTime     =   0.0
@@ -56,12 +65,17 @@ class Adafruit_Thermal(Serial):
 	writeToStdout   = False
 	maxPrintingDots = 10 # 5
 	heatingInterval = 10 # 4
+	imageBuffer     = None
+	maxChunkDots    = 1536
 
 	def __init__(self, *args, **kwargs):
 		# NEW BEHAVIOR: if no parameters given, output is written
 		# to stdout, to be piped through 'lp -o raw' (old behavior
 		# was to use default port & baud rate).
 		baudrate = 19200
+		# Pass flowControl=FlowControl(...) to change how waits
+		# for the printer are timed (see timeoutWait).
+		self.flowControl = kwargs.pop('flowControl', None) or FlowControl()
 		if len(args) == 0:
 			self.writeToStdout = True
 		if len(args) == 1:
@@ -155,12 +169,14 @@ class Adafruit_Thermal(Serial):
 
 	# Sets estimated completion time for a just-issued task.
 	def timeoutSet(self, x):
-		self.resumeTime = time.time() + x
+		self.flowControl.set(x)
 
 	# Waits (if necessary) for the prior task to complete.
+	# Sleeps rather than spins for all but the last moment,
+	# so other threads get the CPU while the printer works.
 	def timeoutWait(self):
 		if self.writeToStdout is False:
-			while (time.time() - self.resumeTime) < 0: pass
+			self.flowControl.wait()
 
 	# Printer performance may vary based on the power supply voltage,
 	# thickness of paper, phase of the moon and other seemingly random
@@ -182,8 +198,8 @@ class Adafruit_Thermal(Serial):
 		else:
 			self.timeoutWait()
 			self.timeoutSet(len(args) * self.byteTime)
-			for arg in args:
-				super(Adafruit_Thermal, self).write(bytes([int(arg)]))
+			super(Adafruit_Thermal, self).write(
+			  bytes([int(arg) for arg in args]))
 
 	# Override write() method to keep track of paper feed.
 	def write(self, *data):
@@ -464,7 +480,7 @@ class Adafruit_Thermal(Serial):
 	# Feeds by the specified number of individual pixel rows
 	def feedRows(self, rows):
 		self.writeBytes(27, 74, rows)
-		self.timeoutSet(rows * dotFeedTime)
+		self.timeoutSet(rows * self.dotFeedTime)
 		self.prevByte = '\n'
 		self.column = 0
 
@@ -500,97 +516,277 @@ class Adafruit_Thermal(Serial):
 	def underlineOff(self):
 		self.writeBytes(27, 45, 0)
 
-	def printBitmap(self, w, h, bitmap, LaaT=False):
-		rowBytes = (w + 7) / 8  # Round up to next byte boundary
+	# Prints a packed bitmap, 8 dots per byte, MSB first, rows of
+	# (w + 7) / 8 bytes.  Only the rows and bytes that print are
+	# sent: bytes right of the rightmost dot are left off every
+	# row (rows always start at the left edge, so nothing moves)
+	# and runs of blank rows become paper feeds (feedRows), unless
+	# a run is so short that splitting the chunk costs more bytes.
+	# The paper comes out the same.  With trim=True blank rows at
+	# the top and bottom are left out altogether.
+	#
+	# LaaT='auto' sizes each chunk from the dots in its rows: up
+	# to 255 rows and maxChunkDots dots, so sparse stretches go
+	# out in long chunks, saving a header and a wait per row, and
+	# dense ones in chunks of a few rows, close to line-at-a-time.
+	def printBitmap(self, w, h, bitmap, LaaT=False, trim=False):
+		rows = self._bitmapRows(w, h, bitmap)
+		rowBytesSent = rows.shape[1]
+		rowData = memoryview(rows.reshape(-1))
+
+		for rowStart, rowEnd, dots in self._bitmapPlan(rows, LaaT, trim):
+			if dots is None:
+				self.feedRows(rowEnd - rowStart)
+				continue
+			# Timeout wait happens here
+			self.writeBytes(18, 42, rowEnd - rowStart, rowBytesSent)
+			chunkData = rowData[rowStart * rowBytesSent:rowEnd * rowBytesSent]
+			if self.writeToStdout:
+				sys.stdout.write(chunkData.tobytes().decode('latin-1'))
+			else:
+				super(Adafruit_Thermal, self).write(chunkData)
+			# Calculated timeout based on the printing density.
+			self.timeoutSet(0.0001 * dots)
+
+		self.prevByte = '\n'
+
+	# Prints rows as they come from an iterable, e.g. a generator
+	# drawing a banner of any length.  Each item is one row (1D
+	# array) or a block of rows (2D, or 3D for RGB) of dots: boolean
+	# (True prints) or greyscale/RGB (dark pixels print, no
+	# dithering), cropped to 384 dots.  Rows are packed into a
+	# window of bufferRows rows that is printed with printBitmap()
+	# each time it fills, so memory stays the same however long
+	# the print and the first rows go out while later ones are
+	# still being made.  Fewer bufferRows start printing sooner,
+	# more let blank stretches become feeds and LaaT='auto' make
+	# longer chunks.
+	def printRows(self, rows, LaaT=False, reverse = False, bufferRows = 255):
+		maxWidth = 384
+		window = np.zeros((bufferRows, maxWidth // 8), dtype=np.uint8)
+		filled = 0
+		for block in rows:
+			dots = np.asarray(block)
+			if dots.ndim == 1:
+				dots = dots[None]
+			if dots.dtype != np.bool_:
+				if dots.ndim == 3:
+					dots = dots[..., :3].mean(axis=2)
+				dots = dots < 128
+			if reverse is True:
+				dots = ~dots
+			dots = dots[:, :maxWidth]
+			start = 0
+			while start < len(dots):
+				n = min(len(dots) - start, bufferRows - filled)
+				packed = np.packbits(dots[start:start + n], axis=1)
+				window[filled:filled + n, packed.shape[1]:] = 0
+				window[filled:filled + n, :packed.shape[1]] = packed
+				filled += n
+				start += n
+				if filled == bufferRows:
+					self.printBitmap(maxWidth, filled, window, LaaT)
+					filled = 0
+		if filled:
+			self.printBitmap(maxWidth, filled, window[:filled], LaaT)
+		self.prevByte = '\n'
+
+	# Predicts what printBitmap(w, h, bitmap, LaaT, trim) will send
+	# and how long it will take, without sending anything: the
+	# same chunks and feeds, timed with the same estimates the
+	# flow control waits on (0.0001 s per dot printed, dotFeedTime
+	# per row fed), each taking at least as long as its bytes take
+	# on the serial line.  Returns a PrintEstimate.
+	def estimateBitmap(self, w, h, bitmap, LaaT=False, trim=False):
+		rows = self._bitmapRows(w, h, bitmap)
+		rowBytesSent = rows.shape[1]
+		bytesSent = dotsPrinted = printedRows = fedRows = 0
+		seconds = 0.0
+		for rowStart, rowEnd, dots in self._bitmapPlan(rows, LaaT, trim):
+			n = rowEnd - rowStart
+			if dots is None:
+				size, busy = 3, n * self.dotFeedTime
+				fedRows += n
+			else:
+				size, busy = 4 + n * rowBytesSent, 0.0001 * dots
+				dotsPrinted += dots
+				printedRows += n
+			bytesSent += size
+			seconds += max(size * self.byteTime, busy)
+		return PrintEstimate(bytesSent, dotsPrinted, printedRows, fedRows, seconds)
+
+	# Rows of a packed bitmap as a 2D byte array, clipped to the
+	# printable width and to the rightmost printed byte.
+	def _bitmapRows(self, w, h, bitmap):
+		rowBytes = (w + 7) // 8  # Round up to next byte boundary
 		if rowBytes >= 48:
 			rowBytesClipped = 48  # 384 pixels max width
 		else:
 			rowBytesClipped = rowBytes
 
+		if isinstance(bitmap, (bytes, bytearray, memoryview)):
+			data = np.frombuffer(bitmap, dtype=np.uint8)
+		else:
+			data = np.asarray(bitmap, dtype=np.uint8).ravel()
+		rows = data[:h * rowBytes].reshape(h, rowBytes)[:, :rowBytesClipped]
+		inked = np.flatnonzero(rows.any(axis=0))
+		rowBytesSent = int(inked[-1]) + 1 if len(inked) else 0
+		return np.ascontiguousarray(rows[:, :rowBytesSent])
+
+	# What printBitmap sends for rows, in order, as (start, end,
+	# dots) tuples: a chunk of rows start to end heating dots
+	# dots, or, with dots None, rows start to end fed blank (at
+	# most 255 at a time).
+	def _bitmapPlan(self, rows, LaaT, trim):
 		# if LaaT (line-at-a-time) is True, print bitmaps
 		# scanline-at-a-time (rather than in chunks).
 		# This tends to make for much cleaner printing
 		# (no feed gaps) on large images...but has the
 		# opposite effect on small images that would fit
 		# in a single 'chunk', so use carefully!
-		if LaaT: maxChunkHeight = 1
-		else:    maxChunkHeight = 255
-
-		i = 0
-		for rowStart in range(0, h, maxChunkHeight):
-			chunkHeight = h - rowStart
-			if chunkHeight > maxChunkHeight:
-				chunkHeight = maxChunkHeight
-
-			# Timeout wait happens here
-			self.writeBytes(18, 42, chunkHeight, rowBytesClipped)
-			dotsCount = 0
-			for y in range(chunkHeight):
-				for x in range(int(rowBytesClipped)):
-					i = int(i)
-					if self.writeToStdout:
-						sys.stdout.write(
-						  chr(bitmap[i]))
-					else:
-						dotsCount += bin(bitmap[i]).count("1")
-						super(Adafruit_Thermal,
-						  self).write(bytes([bitmap[i]]))
-					i += 1
-				i += rowBytes - rowBytesClipped
-			# Calculated timeout based on the printing density.
-			self.timeoutSet(0.0001 * dotsCount)
-
-		self.prevByte = '\n'
-
-	# Print Image.  Requires Python Imaging Library.  This is
-	# specific to the Python port and not present in the Arduino
-	# library.  Image will be cropped to 384 pixels width if
-	# necessary, and converted to 1-bit w/diffusion dithering.
-	# For any other behavior (scale, B&W threshold, etc.), use
-	# the Imaging Library to perform such operations before
-	# passing the result to this function.
-	def printImage(self, image, LaaT=False, reverse = False, rotate = False, auto_resize = True):
-		from PIL import Image
-		from PIL import ImageOps
+		adaptive = LaaT == 'auto'
+		if LaaT is True: maxChunkHeight = 1
+		else:            maxChunkHeight = 255
+
+		# Dots per row for the print timeouts and to find
+		# blank rows, popcount of every byte at once
+		dotsPerRow = np.unpackbits(rows, axis=1).sum(axis=1)
+		dotsBefore = np.concatenate(([0], np.cumsum(dotsPerRow, dtype=np.int64))).tolist()
+
+		for start, end, blank in self._bitmapRuns(dotsPerRow, rows.shape[1], LaaT is True, trim):
+			if blank:
+				while start < end:
+					rowsFed = min(end - start, 255)
+					yield start, start + rowsFed, None
+					start += rowsFed
+				continue
+			rowStart = start
+			while rowStart < end:
+				rowEnd = min(rowStart + maxChunkHeight, end)
+				if adaptive:
+					# Most rows whose dots fit maxChunkDots
+					rowEnd = bisect.bisect_right(dotsBefore,
+					  dotsBefore[rowStart] + self.maxChunkDots,
+					  rowStart + 1, rowEnd + 1) - 1
+					rowEnd = max(rowEnd, rowStart + 1)
+				yield rowStart, rowEnd, dotsBefore[rowEnd] - dotsBefore[rowStart]
+				rowStart = rowEnd
+
+	# Splits bitmap rows into runs to print and blank runs to
+	# feed, as (start, end, blank) tuples.  A blank run is fed
+	# when that takes fewer bytes than printing it: 3 per feed,
+	# plus 4 for the header of the chunk it splits, against the
+	# run's row bytes and, line at a time, a header per row.
+	# Without any ink there are no row bytes to send, and DC2 *
+	# needs at least one byte per row, so it is all fed.
+	def _bitmapRuns(self, dotsPerRow, rowBytes, LaaT, trim):
+		blank = dotsPerRow == 0
+		first, last = 0, len(blank)
+		if trim:
+			printed = np.flatnonzero(~blank)
+			if len(printed) == 0:
+				return []
+			first, last = int(printed[0]), int(printed[-1]) + 1
+		if first == last:
+			return []
+		edges = (np.flatnonzero(np.diff(blank[first:last].astype(np.int8))) + 1 + first).tolist()
+		runs = []
+		for start, end in zip([first] + edges, edges + [last]):
+			n = end - start
+			feedCost = 3 * ((n + 254) // 255) + (0 if LaaT else 4)
+			printCost = n * rowBytes + (4 * n if LaaT else 0)
+			isBlank = bool(blank[start]) and (rowBytes == 0 or feedCost < printCost)
+			if runs and not isBlank and not runs[-1][2]:
+				runs[-1] = (runs[-1][0], end, False)
+			else:
+				runs.append((start, end, isBlank))
+		return runs
+
+	# Print Image.  Requires Python Imaging Library for anything
+	# but numpy arrays.  This is specific to the Python port and
+	# not present in the Arduino library.  Image will be cropped to
+	# 384 pixels width if necessary, and converted to 1-bit
+	# w/diffusion dithering, or with any of the dither module's
+	# modes (dither='ordered', 'adaptive', ...).  For any other
+	# behavior (scale, B&W threshold, etc.), use the Imaging
+	# Library to perform such operations before passing the
+	# result to this function.
+	def printImage(self, image, LaaT=False, reverse = False, rotate = False, auto_resize = True, trim = False, dither = None):
+		width, height, bitmap = self.imageToBitmap(
+		  image, reverse, rotate, auto_resize, dither)
+		self.printBitmap(width, height, bitmap, LaaT, trim)
+
+	# Converts an image to the packed bitmap printBitmap() takes,
+	# returning (width, height, bitmap).  image can be a file
+	# name, a PIL image, or a numpy array: greyscale or RGB
+	# (dark pixels print), or boolean (True prints).  Numpy arrays
+	# are thresholded at mid grey rather than dithered.  The
+	# image becomes a boolean array of dots once, rotation,
+	# inversion and resizing are array operations and rows are
+	# packed 8 dots per byte by numpy.  The returned bitmap is a
+	# buffer reused by the next call, copy it to keep it.
+	# With a dither mode (see the dither module) the image is
+	# kept greyscale, area resized to the printer's resolution
+	# and only then dithered.
+	def imageToBitmap(self, image, reverse = False, rotate = False, auto_resize = True, dither = None):
+		dots = self._imageDots(image, reverse, rotate, auto_resize, dither)
+		height, width = dots.shape
+		packed = np.packbits(dots, axis=1)
+		if self.imageBuffer is None or len(self.imageBuffer) != packed.size:
+			self.imageBuffer = bytearray(packed.size)
+		np.frombuffer(self.imageBuffer, dtype=np.uint8).reshape(packed.shape)[...] = packed
+		return width, height, self.imageBuffer
+
+	# Predicts what printImage() with the same arguments sends and
+	# how long it takes, see estimateBitmap.  The image is
+	# converted without touching imageBuffer, so this is safe to
+	# call while another thread prints.
+	def estimateImage(self, image, LaaT=False, reverse = False, rotate = False, auto_resize = True, trim = False, dither = None):
+		dots = self._imageDots(image, reverse, rotate, auto_resize, dither)
+		height, width = dots.shape
+		return self.estimateBitmap(width, height,
+		  np.packbits(dots, axis=1), LaaT, trim)
+
+	# The boolean dots imageToBitmap() packs, True where printed.
+	def _imageDots(self, image, reverse, rotate, auto_resize, dither):
+		maxWidth = 384
 		if isinstance(image, str):
+			from PIL import Image
 			image = Image.open(image)
+		if dither is not None:
+			return self._ditherImage(image, reverse, rotate, auto_resize, dither)
+		if not isinstance(image, np.ndarray):
+			# PIL dithers to 1-bit in C, 0 is black
+			if image.mode != '1':
+				image = image.convert('1')
+			image = ~np.asarray(image, dtype=np.bool_)
+		# Threshold, rotation and nearest neighbour resizing are
+		# shared with the sketch package, see dither.image_dots
+		return image_dots(image, reverse is True, rotate is True,
+		  auto_resize is True, maxWidth)
+
+	def _ditherImage(self, image, reverse, rotate, autoResize, mode):
+		import cv2
+		from .dither import dither
 		maxWidth = 384
+		if isinstance(image, np.ndarray):
+			grey = image
+			if grey.dtype == np.bool_:
+				grey = np.where(grey, 0, 255).astype(np.uint8)
+			elif grey.ndim == 3:
+				grey = grey[..., :3].mean(axis=2).astype(np.uint8)
+		else:
+			grey = np.asarray(image.convert('L'))
+		if reverse is True:
+			grey = 255 - grey
 		if rotate is True:
-			image = image.rotate(90, expand=True)
-		if image.mode != '1':
-			if reverse is True:
-				image = image.convert('L')
-				image = ImageOps.invert(image)
-			image = image.convert('1')
-
-		width  = image.size[0]
-		height = image.size[1]
-
-		if auto_resize is True:
-			image = image.resize((maxWidth, int(maxWidth/width*height)))
-			width  = image.size[0]
-			height = image.size[1]
-		if width > maxWidth:
-			width = maxWidth
-		rowBytes = int((width + 7) / 8)
-		bitmap   = bytearray(rowBytes * height)
-		pixels   = image.load()
-
-		for y in range(height):
-			n = y * rowBytes
-			x = 0
-			for b in range(rowBytes):
-				sum = 0
-				bit = 128
-				while bit > 0:
-					if x >= width: break
-					if pixels[x, y] == 0:
-						sum |= bit
-					x    += 1
-					bit >>= 1
-				bitmap[n + b] = sum
-
-		self.printBitmap(width, height, bitmap, LaaT)
+			grey = np.rot90(grey)
+		height, width = grey.shape
+		if autoResize is True:
+			newHeight = max(1, int(maxWidth / width * height))
+			grey = cv2.resize(np.ascontiguousarray(grey), (maxWidth, newHeight),
+			  interpolation=cv2.INTER_AREA)
+		return dither(grey[:, :maxWidth], mode)
 
 	# Take the printer offline. Print commands sent after this
 	# will be ignored until 'online' is called.
@@ -617,7 +813,7 @@ class Adafruit_Thermal(Serial):
 		self.timeoutSet(0)
 		self.writeBytes(255)
 		if self.firmwareVersion >= 264:
-			time.sleep(0.05)            # 50 ms
+			self.timeoutSet(0.05)       # 50 ms
 			self.writeBytes(27, 118, 0) # Sleep off (important!)
 		else:
 			for i in range(10):
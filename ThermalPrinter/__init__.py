@@ -1 +1,3 @@
-from .Adafruit_Thermal import Adafruit_Thermal
\ No newline at end of file
+from .Adafruit_Thermal import Adafruit_Thermal
+from .flowcontrol import FlowControl
+from .spooler import PrintSpooler
\ No newline at end of file
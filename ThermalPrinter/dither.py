@@ -0,0 +1,164 @@
+"""Turn greyscale images into the 1-bit dots a thermal printer prints.
+
+Every mode takes a 2D uint8 greyscale array (0 black, 255 white) and returns a boolean array, True where a dot
+is printed. pack() turns that into the rows Adafruit_Thermal.printBitmap takes, and Adafruit_Thermal.printImage
+takes any of the modes through its dither argument. Without one it thresholds the image, see image_dots().
+
+    python3 -m ThermalPrinter.dither [image]   # throughput of every mode
+"""
+import time
+import numpy as np
+
+
+def threshold(grey, level=128):
+    """dots where the image is darker than level"""
+    return np.asarray(grey) < level
+
+
+def adaptive_threshold(grey, block=31, offset=8):
+    """dots where a pixel is darker than the mean of the block x block square around it by more than offset.
+    Keeps lines visible across uneven lighting, e.g. for camera pictures.
+    """
+    grey = np.asarray(grey, dtype=np.float32)
+    height, width = grey.shape
+    radius = block // 2
+    # box sums from a summed area table, the window clipped at the edges
+    table = np.zeros((height + 1, width + 1), dtype=np.float64)
+    table[1:, 1:] = grey.cumsum(axis=0).cumsum(axis=1)
+    y0 = np.clip(np.arange(height) - radius, 0, height)
+    y1 = np.clip(np.arange(height) + radius + 1, 0, height)
+    x0 = np.clip(np.arange(width) - radius, 0, width)
+    x1 = np.clip(np.arange(width) + radius + 1, 0, width)
+    sums = (table[y1][:, x1] - table[y0][:, x1] - table[y1][:, x0] + table[y0][:, x0])
+    area = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+    return grey < sums / area - offset
+
+
+def bayer_matrix(size):
+    """size x size ordered dither thresholds in [0, 1), size a power of two"""
+    matrix = np.zeros((1, 1))
+    while matrix.shape[0] < size:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return (matrix + 0.5) / matrix.size
+
+
+def ordered(grey, size=8):
+    """Bayer ordered dither: compare every pixel with a tiled threshold matrix"""
+    grey = np.asarray(grey)
+    height, width = grey.shape
+    matrix = bayer_matrix(size) * 255
+    tiled = np.tile(matrix, (height // size + 1, width // size + 1))[:height, :width]
+    return grey < tiled
+
+
+# error diffusion kernels: (dy, dx, weight) of the neighbours that take a share of each pixel's error
+KERNELS = {
+    'floyd-steinberg': [(0, 1, 7 / 16), (1, -1, 3 / 16), (1, 0, 5 / 16), (1, 1, 1 / 16)],
+    'atkinson': [(0, 1, 1 / 8), (0, 2, 1 / 8), (1, -1, 1 / 8), (1, 0, 1 / 8), (1, 1, 1 / 8), (2, 0, 1 / 8)],
+}
+
+
+def error_diffusion(grey, kernel='floyd-steinberg'):
+    """error diffusion dither, left to right on every row.
+
+    A pixel only depends on pixels left of it on its row and on rows above, at most one column to the right
+    per row up, so all pixels with the same 2 * y + x are independent. They are processed together, one
+    anti-diagonal at a time, which takes 2 * height + width array steps instead of a step per pixel.
+    """
+    weights = KERNELS[kernel]
+    grey = np.asarray(grey, dtype=np.float32)
+    height, width = grey.shape
+    values = grey.copy()
+    dots = np.zeros((height, width), dtype=bool)
+    for t in range(2 * (height - 1) + width):
+        ys = np.arange(max(0, (t - width + 2) // 2), min(height - 1, t // 2) + 1)
+        xs = t - 2 * ys
+        pixel = values[ys, xs]
+        ink = pixel < 128
+        dots[ys, xs] = ink
+        error = pixel - np.where(ink, 0.0, 255.0)
+        for dy, dx, weight in weights:
+            ny, nx = ys + dy, xs + dx
+            inside = (ny < height) & (nx >= 0) & (nx < width)
+            values[ny[inside], nx[inside]] += error[inside] * weight
+    return dots
+
+
+MODES = {
+    'threshold': threshold,
+    'adaptive': adaptive_threshold,
+    'ordered': ordered,
+    'floyd-steinberg': lambda grey: error_diffusion(grey, 'floyd-steinberg'),
+    'atkinson': lambda grey: error_diffusion(grey, 'atkinson'),
+}
+
+
+def dither(grey, mode='floyd-steinberg', **kwargs):
+    """dither with one of MODES
+
+    :return: boolean array, True where a dot is printed
+    """
+    if mode not in MODES:
+        raise ValueError('unknown dither mode {}, use one of {}'.format(mode, ', '.join(MODES)))
+    return MODES[mode](grey, **kwargs)
+
+
+def image_dots(image, reverse=False, rotate=False, resize=True, width=384):
+    """dots of a numpy image as Adafruit_Thermal.printImage prints it without a dither mode. Boolean arrays
+    are dots already, greyscale and RGB ones are thresholded at mid grey. reverse inverts the dots, rotate
+    turns them like PIL's rotate(90, expand=True) and resize scales them to width with nearest neighbour
+    sampling, like PIL resizing a 1-bit image.
+
+    :return: boolean array at most width dots wide, True where a dot is printed
+    """
+    dots = np.asarray(image)
+    if dots.dtype != np.bool_:
+        if dots.ndim == 3:
+            dots = dots[..., :3].mean(axis=2)
+        dots = dots < 128
+    if reverse:
+        dots = ~dots
+    if rotate:
+        dots = np.rot90(dots)
+    if resize:
+        height, old_width = dots.shape
+        new_height = int(width / old_width * height)
+        rows = ((np.arange(new_height) + 0.5) * (height / new_height)).astype(np.intp)
+        cols = ((np.arange(width) + 0.5) * (old_width / width)).astype(np.intp)
+        dots = dots[rows[:, None], cols]
+    return dots[:, :width]
+
+
+def pack(dots):
+    """rows of dots packed 8 per byte, MSB first, as Adafruit_Thermal.printBitmap takes them
+
+    :return: width, height, bitmap
+    """
+    height, width = dots.shape
+    return width, height, bytearray(np.packbits(dots, axis=1).tobytes())
+
+
+def throughput(grey, modes=None, repeats=3):
+    """megapixels per second of each mode on grey
+
+    :return: dict of mode to throughput
+    """
+    rates = {}
+    for mode in modes or MODES:
+        t0 = time.perf_counter()
+        for _ in range(repeats):
+            dither(grey, mode)
+        rates[mode] = grey.size * repeats / (time.perf_counter() - t0) / 1e6
+    return rates
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        from PIL import Image
+        image = np.asarray(Image.open(sys.argv[1]).convert('L'))
+    else:
+        image = np.tile(np.linspace(0, 255, 384, dtype=np.float32), (512, 1)).astype(np.uint8)
+    print('{} x {} image'.format(image.shape[1], image.shape[0]))
+    for mode, rate in throughput(image).items():
+        print('{:>16}: {:8.2f} Mpixel/s'.format(mode, rate))
@@ -0,0 +1,340 @@
+"""Virtual thermal printer on a pseudo terminal.
+
+PrinterEmulator opens a pty and decodes what Adafruit_Thermal writes to it, so prints can be benchmarked and
+checked without the printer:
+
+    with PrinterEmulator() as emulator:
+        printer = Adafruit_Thermal(emulator.port, 19200)
+        printer.printImage('./data/paint.png', LaaT=True, rotate=True)
+        printer.timeoutWait()
+        print(emulator.report(wait=True))
+        emulator.save_png('paper.png')
+
+    python3 -m ThermalPrinter.emulator image [--baudrate] [--png]
+"""
+import os
+import threading
+import time
+import tty
+from collections import namedtuple
+import numpy as np
+import cv2
+from serial import Serial
+from .Adafruit_Thermal import Adafruit_Thermal
+from .flowcontrol import FlowControl
+
+ESC = 27
+GS = 29
+DC2 = 18
+
+# What the printer did since the last report: bytes received, dots heated, bitmap rows printed, rows fed
+# without printing, and the simulated seconds it took, limited by the serial line and by the print head.
+EmulatorReport = namedtuple('EmulatorReport', ['bytes', 'dots', 'printed_rows', 'fed_rows', 'seconds'])
+
+# Bytes of parameters following each ESC and GS command Adafruit_Thermal sends, for firmware 2.64 and later.
+# ESC D (tab stops) and GS k (barcode) have variable lengths and are handled separately.
+ESC_ARGS = {64: 0, 55: 3, 33: 1, 45: 1, 61: 1, 56: 2, 118: 1, 51: 1, 82: 1, 116: 1, 32: 1, 97: 1, 74: 1, 100: 1}
+GS_ARGS = {33: 1, 66: 1, 104: 1, 72: 1, 119: 1, 114: 1}
+
+
+class PrinterEmulator(object):
+    """decodes the ESC/GS/DC2 command stream of an Adafruit thermal printer arriving on a pty.
+
+    Bitmaps (DC2 *) are printed onto an in-memory paper roll, feeds (ESC d, ESC J, newlines) advance it and
+    the print settings (ESC 7) drive the timing model. Text is not rendered, text lines only advance the paper.
+
+    Timing model: bytes arrive at 11 bits per byte at baudrate. A bitmap row starts once its data has
+    arrived and the previous row is done, and takes dot_feed_time to step the paper plus one heating cycle
+    of heat time + heat interval for every group of up to 8 * (heat dots + 1) printed dots. Fed rows take
+    dot_feed_time each.
+    """
+
+    def __init__(self, baudrate=19200, width=384, dot_feed_time=0.0021, realtime=False):
+        """
+        :param realtime: read no faster than baudrate, so the host blocks on a full pty like on a real port
+        """
+        self._baudrate = baudrate
+        self._byte_time = 11.0 / baudrate
+        self._width = width
+        self._dot_feed_time = dot_feed_time
+        self._realtime = realtime
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._paper = []
+        self._pending = bytearray()
+        # ESC 7 defaults, in printer units
+        self._heat_dots = 7
+        self._heat_time = 80
+        self._heat_interval = 2
+        self._line_height = 30
+        # simulated clock: when the serial line and the print head are next free
+        self._line_free = 0.0
+        self._head_free = 0.0
+        self._received = 0
+        self._job_start = 0.0
+        self._reset_counters()
+        self._master = self._slave = None
+        self._thread = None
+
+    def open(self):
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self._thread = threading.Thread(target=self._read, name='PrinterEmulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        if self._slave is not None:
+            os.close(self._slave)
+            self._slave = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._master is not None:
+            os.close(self._master)
+            self._master = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def port(self):
+        """device name to pass to Adafruit_Thermal"""
+        return os.ttyname(self._slave)
+
+    def feed(self, data, at=None):
+        """decode bytes as if they had arrived on the port, e.g. to replay Adafruit_Thermal's stdout output
+
+        :param at: simulated time the host sent them, the serial line idles until then
+        """
+        with self._lock:
+            if at is not None:
+                self._line_free = max(self._line_free, at)
+            self._received += len(data)
+            self._pending += data
+            self._decode()
+            self._idle.notify_all()
+
+    def connect(self, baudrate=None):
+        """an Adafruit_Thermal wired straight to the emulator, no pty, on a simulated clock: its waits for
+        the printer return at once and advance the clock instead, and the emulator's serial line idles
+        while the host waits. Gives the time a print takes in seconds without taking them.
+        """
+        printer = _EmulatedPrinter.__new__(_EmulatedPrinter)
+        # wired up before __init__, which already talks to the printer
+        printer.emulator = self
+        printer.clock = SimulatedClock()
+        printer.__init__(None, baudrate or self._baudrate,
+                         flowControl=FlowControl(printer.clock.time, printer.clock.sleep))
+        return printer
+
+    def wait_idle(self, quiet=0.1, timeout=10.0):
+        """wait until nothing has arrived for quiet seconds and everything received has been decoded"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while time.monotonic() < deadline:
+                received = self._received
+                self._idle.wait(quiet)
+                if self._received == received and not self._pending:
+                    return True
+        return False
+
+    def report(self, wait=False):
+        """counters since the previous report, then start counting again
+
+        :param wait: call wait_idle first
+        :return: EmulatorReport
+        """
+        if wait:
+            self.wait_idle()
+        with self._lock:
+            done = max(self._line_free, self._head_free)
+            report = EmulatorReport(self._bytes, self._dots, self._printed_rows, self._fed_rows,
+                                    done - self._job_start)
+            self._reset_counters()
+            self._job_start = self._line_free = self._head_free = done
+        return report
+
+    def paper(self):
+        """everything printed so far, a boolean array with True where a dot was heated"""
+        with self._lock:
+            if not self._paper:
+                return np.zeros((0, self._width), dtype=bool)
+            return np.concatenate(self._paper)
+
+    def save_png(self, path):
+        cv2.imwrite(str(path), np.where(self.paper(), 0, 255).astype(np.uint8))
+
+    def clear_paper(self):
+        with self._lock:
+            self._paper = []
+
+    def _reset_counters(self):
+        self._bytes = 0
+        self._dots = 0
+        self._printed_rows = 0
+        self._fed_rows = 0
+
+    def _read(self):
+        while True:
+            try:
+                data = os.read(self._master, 4096)
+            except OSError:
+                return
+            if not data:
+                return
+            if self._realtime:
+                time.sleep(len(data) * self._byte_time)
+            self.feed(data)
+
+    def _decode(self):
+        """consume every complete command in the pending bytes"""
+        data = self._pending
+        i = 0
+        while i < len(data):
+            used = self._command(data, i)
+            if used == 0:
+                break
+            self._arrive(used)
+            i += used
+        del data[:i]
+
+    def _arrive(self, count):
+        self._bytes += count
+        self._line_free += count * self._byte_time
+
+    def _command(self, data, i):
+        """decode the command at data[i]
+
+        :return: bytes it takes, 0 if it has not all arrived yet
+        """
+        available = len(data) - i
+        c = data[i]
+        if c == DC2:
+            if available < 2:
+                return 0
+            op = data[i + 1]
+            if op == 42:
+                if available < 4:
+                    return 0
+                rows, row_bytes = data[i + 2], data[i + 3]
+                size = 4 + rows * row_bytes
+                if available < size:
+                    return 0
+                self._bitmap(data[i + 4:i + size], rows, row_bytes)
+                return size
+            return 3 if op == 35 else 2
+        if c == ESC:
+            if available < 2:
+                return 0
+            op = data[i + 1]
+            if op == 68:
+                # tab stops, ended by 0
+                end = data.find(0, i + 2)
+                return 0 if end < 0 else end - i + 1
+            size = 2 + ESC_ARGS.get(op, 0)
+            if available < size:
+                return 0
+            args = data[i + 2:i + size]
+            if op == 55:
+                self._heat_dots, self._heat_time, self._heat_interval = args
+            elif op == 74:
+                self._feed_rows(args[0])
+            elif op == 100:
+                self._feed_rows(args[0] * self._line_height)
+            elif op == 51:
+                self._line_height = args[0]
+            elif op == 64:
+                self._line_height = 30
+            return size
+        if c == GS:
+            if available < 2:
+                return 0
+            op = data[i + 1]
+            if op == 107:
+                # barcode: type, length, data
+                if available < 4 or available < 4 + data[i + 3]:
+                    return 0
+                return 4 + data[i + 3]
+            size = 2 + GS_ARGS.get(op, 0)
+            return size if available >= size else 0
+        if c == 10:
+            self._feed_rows(self._line_height)
+        return 1
+
+    def _bitmap(self, data, rows, row_bytes):
+        dots = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8).reshape(rows, row_bytes), axis=1)
+        paper = np.zeros((rows, self._width), dtype=bool)
+        width = min(self._width, dots.shape[1])
+        paper[:, :width] = dots[:, :width]
+        self._paper.append(paper)
+        # rows are printed as their bytes arrive, each waiting for the head to finish the previous one
+        header_done = self._line_free + 4 * self._byte_time
+        dots_per_row = paper.sum(axis=1)
+        strobe = 8 * (self._heat_dots + 1)
+        cycle = (self._heat_time + self._heat_interval) * 10e-6
+        row_times = (self._dot_feed_time + np.ceil(dots_per_row / strobe) * cycle).tolist()
+        head = self._head_free
+        for y in range(rows):
+            arrived = header_done + (y + 1) * row_bytes * self._byte_time
+            head = max(head, arrived) + row_times[y]
+        self._head_free = head
+        self._dots += int(dots_per_row.sum())
+        self._printed_rows += rows
+
+    def _feed_rows(self, rows):
+        self._paper.append(np.zeros((rows, self._width), dtype=bool))
+        self._head_free = max(self._head_free, self._line_free) + rows * self._dot_feed_time
+        self._fed_rows += rows
+
+
+class SimulatedClock(object):
+    """clock for FlowControl that sleeps by moving its time forward"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+
+class _Port(Serial):
+    def write(self, data):
+        self.emulator.feed(bytes(data), at=self.clock.time())
+        return len(data)
+
+
+class _EmulatedPrinter(Adafruit_Thermal, _Port):
+    """Adafruit_Thermal whose serial writes go to PrinterEmulator.feed, see PrinterEmulator.connect"""
+    emulator = None
+    clock = None
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='print an image on the emulated printer and report the job')
+    parser.add_argument('image')
+    parser.add_argument('--baudrate', type=int, default=19200)
+    parser.add_argument('--png', default='paper.png', help='where to save the printed paper')
+    parser.add_argument('--laat', action='store_true', help='print line at a time')
+    args = parser.parse_args()
+    with PrinterEmulator(args.baudrate) as emulator:
+        printer = Adafruit_Thermal(emulator.port, args.baudrate)
+        printer.timeoutWait()
+        emulator.report(wait=True)
+        t0 = time.perf_counter()
+        printer.printImage(args.image, LaaT=args.laat, rotate=True)
+        printer.feed(2)
+        printer.timeoutWait()
+        host = time.perf_counter() - t0
+        report = emulator.report(wait=True)
+        printer.close()
+        emulator.save_png(args.png)
+    print('{} bytes, {} dots, {} rows printed, {} rows fed: {:.2f} s simulated, {:.2f} s on the host'.format(
+        report.bytes, report.dots, report.printed_rows, report.fed_rows, report.seconds, host))
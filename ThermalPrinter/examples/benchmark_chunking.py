@@ -0,0 +1,26 @@
+"""Print a sparse sketch and a dense photo on the emulated printer line at a time, in 255 row chunks and with
+adaptive chunks, and compare bytes sent and simulated print time.
+
+    python3 ThermalPrinter/examples/benchmark_chunking.py [baudrate]
+"""
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from ThermalPrinter.emulator import PrinterEmulator
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+IMAGES = [('sketch', os.path.join(DATA_DIR, 'paint.png')), ('photo', os.path.join(DATA_DIR, 'image1.jpg'))]
+STRATEGIES = [('LaaT=True', True), ('LaaT=False', False), ("LaaT='auto'", 'auto')]
+
+
+if __name__ == '__main__':
+    baudrate = int(sys.argv[1]) if len(sys.argv) > 1 else 19200
+    for name, path in IMAGES:
+        for label, LaaT in STRATEGIES:
+            emulator = PrinterEmulator(baudrate)
+            printer = emulator.connect()
+            emulator.report()
+            printer.printImage(path, LaaT=LaaT, rotate=True)
+            printer.timeoutWait()
+            report = emulator.report()
+            print('{:>6} {:>12}: {:6d} bytes, {:6.2f} s'.format(name, label, report.bytes, report.seconds))
@@ -0,0 +1,31 @@
+"""Compare Adafruit_Thermal.estimateImage with what the emulated printer takes for the same print, and time
+the estimate itself.
+
+    python3 ThermalPrinter/examples/benchmark_estimate.py [baudrate]
+"""
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from ThermalPrinter.emulator import PrinterEmulator
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+IMAGES = [('sketch', os.path.join(DATA_DIR, 'paint.png')), ('photo', os.path.join(DATA_DIR, 'image1.jpg'))]
+STRATEGIES = [('LaaT=True', True), ('LaaT=False', False), ("LaaT='auto'", 'auto')]
+
+
+if __name__ == '__main__':
+    baudrate = int(sys.argv[1]) if len(sys.argv) > 1 else 19200
+    for name, path in IMAGES:
+        for label, LaaT in STRATEGIES:
+            emulator = PrinterEmulator(baudrate)
+            printer = emulator.connect()
+            t0 = time.perf_counter()
+            estimate = printer.estimateImage(path, LaaT=LaaT, rotate=True)
+            took = time.perf_counter() - t0
+            emulator.report()
+            printer.printImage(path, LaaT=LaaT, rotate=True)
+            printer.timeoutWait()
+            report = emulator.report()
+            print('{:>6} {:>12}: estimate {:6d} bytes, {:6.2f} s in {:5.1f} ms, emulated {:6d} bytes, {:6.2f} s'
+                  .format(name, label, estimate.bytes, estimate.seconds, took * 1000, report.bytes, report.seconds))
@@ -0,0 +1,47 @@
+"""Print a sketch sized bitmap to a pseudo terminal standing in for the printer, waiting for the printer
+by spinning (the old timeoutWait) and by FlowControl's sleep then spin, and compare CPU and wall time.
+
+    python3 ThermalPrinter/examples/benchmark_flow_control.py [rows]
+"""
+import os
+import sys
+import threading
+import time
+import tty
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+import numpy as np
+from ThermalPrinter import Adafruit_Thermal, FlowControl
+
+
+def drain(fd):
+    try:
+        while os.read(fd, 4096):
+            pass
+    except OSError:
+        pass
+
+
+def run(flow_control, bitmap, rows):
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    threading.Thread(target=drain, args=(master,), daemon=True).start()
+    printer = Adafruit_Thermal(os.ttyname(slave), 19200, flowControl=flow_control)
+    printer.timeoutWait()
+    cpu, wall = time.process_time(), time.perf_counter()
+    printer.printBitmap(384, rows, bitmap, LaaT=True)
+    printer.timeoutWait()
+    cpu, wall = time.process_time() - cpu, time.perf_counter() - wall
+    printer.close()
+    os.close(slave)
+    os.close(master)
+    return cpu, wall
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = np.random.RandomState(0)
+    # a sparse, sketch like bitmap: about 5% of the dots printed
+    bitmap = bytearray(np.packbits(rng.rand(rows, 384) < 0.05, axis=1).tobytes())
+    for name, flow_control in (('spin', FlowControl(spin=float('inf'))), ('sleep+spin', FlowControl())):
+        cpu, wall = run(flow_control, bitmap, rows)
+        print('{:>10}: {:6.3f} s CPU, {:6.3f} s to finish {} rows'.format(name, cpu, wall, rows))
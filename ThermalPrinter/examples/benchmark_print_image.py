@@ -0,0 +1,71 @@
+"""Time converting and packing a sketch sized image for printBitmap, with the old per pixel loop and with
+Adafruit_Thermal.imageToBitmap, from a PIL image and from a numpy array.
+
+    python3 ThermalPrinter/examples/benchmark_print_image.py [repeats]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+import numpy as np
+from PIL import Image
+from ThermalPrinter import Adafruit_Thermal
+
+
+def pack_loop(image, rotate=True):
+    """printImage's conversion as it was: PIL rotate, dither and resize, then a loop over every pixel"""
+    maxWidth = 384
+    if rotate:
+        image = image.rotate(90, expand=True)
+    image = image.convert('1')
+    image = image.resize((maxWidth, int(maxWidth / image.size[0] * image.size[1])))
+    width, height = image.size
+    rowBytes = (width + 7) // 8
+    bitmap = bytearray(rowBytes * height)
+    pixels = image.load()
+    for y in range(height):
+        n = y * rowBytes
+        x = 0
+        for b in range(rowBytes):
+            sum = 0
+            bit = 128
+            while bit > 0:
+                if x >= width:
+                    break
+                if pixels[x, y] == 0:
+                    sum |= bit
+                x += 1
+                bit >>= 1
+            bitmap[n + b] = sum
+    return width, height, bitmap
+
+
+def make_sketch():
+    """1200x900 line drawing like SketchGizeh's"""
+    import cv2
+    rng = np.random.RandomState(0)
+    image = np.full((900, 1200), 255, dtype=np.uint8)
+    for _ in range(40):
+        points = np.cumsum(rng.normal(0, 25, (30, 2)), axis=0) + rng.uniform((200, 200), (1000, 700))
+        cv2.polylines(image, [points.astype(np.int32)], False, 0, 6)
+    return image
+
+
+def timed(function, repeats):
+    t0 = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return 1000 * (time.perf_counter() - t0) / repeats
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    array = make_sketch()
+    image = Image.fromarray(array)
+    with contextlib.redirect_stdout(io.StringIO()):
+        printer = Adafruit_Thermal()
+    print('pixel loop (PIL):    {:7.2f} ms'.format(timed(lambda: pack_loop(image), repeats)))
+    print('numpy (PIL image):   {:7.2f} ms'.format(timed(lambda: printer.imageToBitmap(image, rotate=True), repeats)))
+    print('numpy (numpy array): {:7.2f} ms'.format(timed(lambda: printer.imageToBitmap(array, rotate=True), repeats)))
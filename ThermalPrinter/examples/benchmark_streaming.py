@@ -0,0 +1,57 @@
+"""Print a long generated banner on the emulated printer, once drawn whole and printed with printImage and once
+streamed block by block with printRows, and compare peak memory and how long the first bytes take.
+
+    python3 ThermalPrinter/examples/benchmark_streaming.py [rows]
+"""
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+import cv2
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from ThermalPrinter.emulator import PrinterEmulator
+
+BLOCK_ROWS = 64
+
+
+def banner_blocks(rows):
+    """the banner in blocks of BLOCK_ROWS greyscale rows, drawn on demand"""
+    for top in range(0, rows, BLOCK_ROWS):
+        block = np.full((min(BLOCK_ROWS, rows - top), 384), 255, dtype=np.uint8)
+        cv2.putText(block, 'row {}'.format(top), (10, 48), cv2.FONT_HERSHEY_SIMPLEX, 1.5, 0, 3)
+        yield block
+
+
+def run(print_banner):
+    """peak traced memory, seconds until the first byte reached the emulator and total seconds on the host"""
+    emulator = PrinterEmulator()
+    printer = emulator.connect()
+    first = []
+    feed = emulator.feed
+
+    def timed_feed(data, at=None):
+        if not first:
+            first.append(time.perf_counter())
+        feed(data, at)
+        # the emulator's paper roll grows with the print whichever way it is sent, it is left out
+        emulator.clear_paper()
+    emulator.feed = timed_feed
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    print_banner(printer)
+    printer.timeoutWait()
+    took = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, first[0] - t0, took
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    runs = [('printImage', lambda printer: printer.printImage(np.concatenate(list(banner_blocks(rows))))),
+            ('printRows', lambda printer: printer.printRows(banner_blocks(rows)))]
+    for name, print_banner in runs:
+        peak, first, took = run(print_banner)
+        print('{:>10}: {} rows, peak {:7.2f} MB, first byte after {:7.2f} ms, {:.2f} s'.format(
+            name, rows, peak / 1e6, first * 1000, took))
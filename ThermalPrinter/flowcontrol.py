@@ -0,0 +1,42 @@
+import time
+
+# seconds before the deadline that waiting with the real clock stops sleeping and spins
+SPIN = 0.0002
+
+
+class FlowControl(object):
+    """keeps track of when the printer can take more data, see Adafruit_Thermal.timeoutSet and timeoutWait.
+
+    Waiting sleeps through most of the remaining time and only spins for the last spin seconds, where sleep
+    is too coarse to hit the deadline, so a print no longer keeps a core busy. clock and sleep can be
+    replaced, e.g. by a fake clock whose sleep just advances it, to run without real time; waits then only
+    sleep, as a fake clock does not move while spinning.
+    """
+
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, spin=None):
+        """
+        :param clock: function returning the current time in seconds
+        :param sleep: function sleeping for a number of seconds
+        :param spin: seconds before the deadline to stop sleeping and spin, float('inf') to always spin.
+        Defaults to SPIN with the real clock and sleep, and to 0, never spinning, when either is replaced.
+        """
+        if spin is None:
+            spin = SPIN if clock is time.monotonic and sleep is time.sleep else 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._spin = spin
+        self._resume = clock()
+
+    def set(self, seconds):
+        """the printer will be busy for seconds from now"""
+        self._resume = self._clock() + seconds
+
+    def wait(self):
+        """return once the printer is ready"""
+        # sleep may return early, sleep again until only the spin is left
+        remaining = self._resume - self._clock()
+        while remaining > self._spin:
+            self._sleep(remaining - self._spin)
+            remaining = self._resume - self._clock()
+        while self._clock() < self._resume:
+            pass
@@ -0,0 +1,165 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+
+class PrintSpooler(object):
+    """runs print jobs on a background thread that owns the printer, so submitting a print returns at once.
+
+    A job is any function taking the printer, e.g. lambda printer: printer.feed(2). Jobs run one at a time,
+    highest priority first and in submission order within a priority. Each submit returns a
+    concurrent.futures.Future: cancel() drops a job that has not started, add_done_callback() runs a function,
+    on the spooler thread, once the job is done, and result() waits for it. Jobs can carry an estimate of
+    the seconds they take, e.g. from Adafruit_Thermal.estimateBitmap, which eta() adds up.
+    """
+
+    def __init__(self, printer, wait_idle=True):
+        """
+        :param printer: Adafruit_Thermal, only used from the spooler thread from now on
+        :param wait_idle: wait for the printer's estimate of the end of each job before calling it done,
+        so completion callbacks fire when the paper stops rather than when the last byte is sent
+        """
+        self._printer = printer
+        self._wait_idle = wait_idle
+        self._queue = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._closed = False
+        # future, start time and estimate of the job being printed
+        self._running = None
+        self._thread = threading.Thread(target=self._run, name='PrintSpooler', daemon=True)
+        self._thread.start()
+
+    def submit(self, job, priority=0, callback=None, seconds=None):
+        """queue a job
+
+        :param job: function called with the printer
+        :param priority: jobs with a higher priority run first
+        :param callback: optional function called with the future once the job is done, failed or cancelled
+        :param seconds: optional estimate of how long the job takes, for eta()
+        :return: Future of the job's return value
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('cannot submit to a closed PrintSpooler')
+            heapq.heappush(self._queue, (-priority, next(self._order), future, job, seconds))
+            self._condition.notify()
+        return future
+
+    def print_bitmap(self, w, h, bitmap, LaaT=False, feed=0, priority=0, callback=None):
+        """queue Adafruit_Thermal.printBitmap, followed by feed lines. The bitmap is copied, so the caller can
+        reuse its buffer straight away, and its print time estimated for eta().
+        """
+        bitmap = bytes(bitmap)
+        seconds = self._printer.estimateBitmap(w, h, bitmap, LaaT).seconds
+
+        def job(printer):
+            printer.printBitmap(w, h, bitmap, LaaT)
+            if feed:
+                printer.feed(feed)
+        return self.submit(job, priority, callback, seconds)
+
+    def print_image(self, image, feed=0, priority=0, callback=None, seconds=None, **kwargs):
+        """queue Adafruit_Thermal.printImage with kwargs, followed by feed lines. The image is only converted
+        on the spooler thread, pass seconds, e.g. from Adafruit_Thermal.estimateImage, for eta() to count it.
+        """
+        def job(printer):
+            printer.printImage(image, **kwargs)
+            if feed:
+                printer.feed(feed)
+        return self.submit(job, priority, callback, seconds)
+
+    def print_rows(self, rows, LaaT=False, feed=0, priority=0, callback=None, seconds=None, **kwargs):
+        """queue Adafruit_Thermal.printRows with kwargs, followed by feed lines. rows is iterated on the
+        spooler thread, a generator is only run once the job starts and then as fast as the printer goes.
+        """
+        def job(printer):
+            printer.printRows(rows, LaaT, **kwargs)
+            if feed:
+                printer.feed(feed)
+        return self.submit(job, priority, callback, seconds)
+
+    def eta(self, future=None):
+        """estimated seconds until the job of future is done, or with no future until every job is. Counts
+        what is left of the running job and the jobs queued before, jobs without an estimate as 0.
+        """
+        with self._condition:
+            seconds = 0.0
+            if self._running is not None:
+                running, started, estimate = self._running
+                seconds = max(0.0, started + (estimate or 0.0) - time.monotonic())
+                if running is future:
+                    return seconds
+            for _, _, queued, _, estimate in sorted(self._queue, key=lambda entry: entry[:2]):
+                if queued.cancelled():
+                    continue
+                seconds += estimate or 0.0
+                if queued is future:
+                    return seconds
+        if future is None:
+            return seconds
+        if future.done():
+            return 0.0
+        raise ValueError('future is not a job of this PrintSpooler')
+
+    def cancel_pending(self):
+        """cancel every job that has not started
+
+        :return: number of jobs cancelled
+        """
+        with self._condition:
+            queued, self._queue = self._queue, []
+        return sum(entry[2].cancel() for entry in queued)
+
+    def __len__(self):
+        """number of jobs waiting to start"""
+        with self._condition:
+            return sum(not entry[2].cancelled() for entry in self._queue)
+
+    def close(self, wait=True, cancel_pending=False):
+        """stop taking jobs. Queued jobs still run unless cancel_pending is set.
+
+        :param wait: wait for the spooler thread to finish its jobs
+        """
+        if cancel_pending:
+            self.cancel_pending()
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait:
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                _, _, future, job, seconds = heapq.heappop(self._queue)
+            if not future.set_running_or_notify_cancel():
+                continue
+            with self._condition:
+                self._running = (future, time.monotonic(), seconds)
+            try:
+                result = job(self._printer)
+                if self._wait_idle:
+                    self._printer.timeoutWait()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+            finally:
+                with self._condition:
+                    self._running = None
@@ -1,19 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
 import logging
+import threading
 import json
 import pickle
+import random
+from .drawingstats import compute_stats, index_path, load_index
+from .simplify import LOD_INFIX, lod_shard_path, select_lod
+from .strokestore import StrokeShard, SHARD_SUFFIX
 
 class DrawingDataset(object):
     """
     interface to the drawing dataset
     """
 
-    def __init__(self, path_to_drawing_dataset, path_to_label_mapping):
+    def __init__(self, path_to_drawing_dataset, path_to_label_mapping, prefetch_workers=2):
         self._path = Path(path_to_drawing_dataset)
         self._categories_filepath = self._path / 'categories.txt'
         self._category_mapping_filepath = path_to_label_mapping
         self._categories = []
         self._category_mapping = dict()
+        self._shards = dict()
+        self._stats = dict()
+        self._drawings = dict()
+        self._pending = dict()
+        self._lock = threading.Lock()
+        self._prefetch_workers = prefetch_workers
+        self._executor = None
         self._logger = logging.getLogger(self.__class__.__name__)
 
     def setup(self):
@@ -29,31 +43,192 @@ class DrawingDataset(object):
         self._categories = self.load_categories(self._path)
 
     def load_categories(self, path):
-        files = Path(path).glob('*.p')
-        categories = [f.stem for f in files]
+        files = list(Path(path).glob('*' + SHARD_SUFFIX)) + list(Path(path).glob('*.p'))
+        categories = sorted(set(f.stem for f in files if LOD_INFIX not in f.stem))
         return categories
 
-    def get_drawing(self, name, index):
-        """get a drawing by name and index starting from 0.
+    def get_shard(self, name, lod=0):
+        """get the memory-mapped shard for a category and level of detail, or None if it has not been built
+        """
+        shard = self._shards.get((name, lod))
+        if shard is None:
+            shard_file = lod_shard_path(self._path / (name + SHARD_SUFFIX), lod)
+            if not shard_file.exists():
+                return None
+            shard = self._shards[(name, lod)] = StrokeShard(shard_file)
+        return shard
+
+    def lod_levels(self, name):
+        """number of levels of detail available for a label name, level 0 being the original drawings
+        """
+        name = self.resolve_name(name)
+        levels = 1
+        while self.get_shard(name, levels) is not None:
+            levels += 1
+        return levels
+
+    def load_drawings(self, name, lod=0):
+        """get all drawings of a category as an indexable sequence.
+        Uses the memory-mapped shard when one has been built, otherwise falls back to the pickle,
+        which only has the original level of detail. Waits for the category if it is being prefetched.
+        """
+        with self._lock:
+            drawings = self._drawings.get((name, lod))
+            pending = self._pending.get(name)
+        if drawings is not None:
+            return drawings
+        if pending is not None:
+            pending.result()
+        return self._load_drawings(name, lod)
+
+    def _load_drawings(self, name, lod):
+        drawings = self._drawings.get((name, lod))
+        if drawings is None:
+            drawings = self.get_shard(name, lod) or self.get_shard(name)
+            if drawings is None:
+                pickleFile = str(self._path / Path(name).with_suffix('.p'))
+                with open(pickleFile,'rb') as f:
+                    drawings = pickle.load(f)
+            with self._lock:
+                drawings = self._drawings.setdefault((name, lod), drawings)
+        return drawings
+
+    def prefetch(self, names):
+        """start loading the drawings of label names in the background, so a later get_drawing
+        does not wait on disk or unpickling.
+
+        :return: list of futures, one per name
+        """
+        futures = []
+        for name in names:
+            name = self.resolve_name(name)
+            with self._lock:
+                future = self._pending.get(name)
+                if future is None and not any(key[0] == name for key in self._drawings):
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self._prefetch_workers)
+                    future = self._pending[name] = self._executor.submit(self._prefetch, name)
+            if future is not None:
+                futures.append(future)
+        return futures
+
+    def _prefetch(self, name):
+        try:
+            for lod in range(self.lod_levels(name)):
+                drawings = self._load_drawings(name, lod)
+                if isinstance(drawings, StrokeShard):
+                    drawings.preload()
+            self.get_stats(name)
+        except Exception as e:
+            # a failed prefetch is retried, and reported, by the next synchronous load
+            self._logger.exception(e)
+        finally:
+            with self._lock:
+                self._pending.pop(name, None)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def resolve_name(self, name):
+        """map a label name onto the dataset category used to draw it
+        """
+        if name not in self._categories:
+            # try and get the closest matching drawing. If nothing suitable foumd then return a scorpion
+            name = self._category_mapping.get(name, 'scorpion')
+        return name
+
+    def num_drawings(self, name):
+        """number of drawings available for a label name
+        """
+        return len(self.load_drawings(self.resolve_name(name)))
+
+    def get_stats(self, name):
+        """per-drawing statistics of a label name: strokes, points, bounding box, stroke length and ink coverage.
+        Read from the index built with the shard, or computed once from the pickle.
+        """
+        name = self.resolve_name(name)
+        stats = self._stats.get(name)
+        if stats is None:
+            shard = self.get_shard(name)
+            if shard is not None and index_path(shard.path).exists():
+                stats = load_index(index_path(shard.path))
+            else:
+                stats = compute_stats(self._load_drawings(name, 0))
+            self._stats[name] = stats
+        return stats
+
+    def sample_drawing(self, name, max_strokes=None, max_points=None, max_ink=None, rng=random):
+        """pick a random drawing index of a label name that fits the given complexity and ink budget.
+        If no drawing fits, the one with the least ink is returned.
+        """
+        stats = self.get_stats(name)
+        fits = np.ones(len(stats), dtype=bool)
+        if max_strokes is not None:
+            fits &= stats['strokes'] <= max_strokes
+        if max_points is not None:
+            fits &= stats['points'] <= max_points
+        if max_ink is not None:
+            fits &= stats['ink'] <= max_ink
+        candidates = np.flatnonzero(fits)
+        if len(candidates) == 0:
+            return int(np.argmin(stats['ink']))
+        return int(candidates[rng.randrange(len(candidates))])
+
+    def get_drawing(self, name, index, lod=0):
+        """get a drawing by name and index starting from 0, optionally simplified to a level of detail.
         """
         try:
-            if name not in self._categories:
-                # try and get the closest matching drawing. If nothing suitable foumd then return a scorpion
-                name = self._category_mapping.get(name, 'scorpion')
-            if index < 0 or index >= 100 or not isinstance(index, int):
-                raise ValueError('index', index, ';index must be integer >= 0 and < 100')
-            pickleFile = str(self._path / Path(name).with_suffix('.p'))
-            with open(pickleFile,'rb') as f:
-                images = pickle.load(f)
-                if index < len(images):
-                    return images[index]
-                else:
-                    print('Drawing {} index {} out of range {}'.format(name, index, len(images)))
-                    return images[0]
+            name = self.resolve_name(name)
+            if not isinstance(index, int) or index < 0:
+                raise ValueError('index', index, ';index must be integer >= 0')
+            images = self.load_drawings(name, lod)
+            if index < len(images):
+                return images[index]
+            else:
+                print('Drawing {} index {} out of range {}'.format(name, index, len(images)))
+                return images[0]
         except ValueError as e:
             self._logger.exception(e)
             raise e
             
+    def get_drawing_lods(self, name, index):
+        """get every level of detail of a drawing, loaded on demand
+        """
+        return DrawingLods(self, name, index, self.lod_levels(name))
+
     @property
     def categories(self):
         return self._categories
+
+
+class DrawingLods(object):
+    """levels of detail of one drawing, from the original (0) to the coarsest
+    """
+
+    def __init__(self, dataset, name, index, levels):
+        self._dataset = dataset
+        self._name = name
+        self._index = index
+        self._levels = levels
+
+    def __len__(self):
+        return self._levels
+
+    def __getitem__(self, lod):
+        return self._dataset.get_drawing(self._name, self._index, lod)
+
+    def select_level(self, px_per_unit, tolerance=0.5):
+        """coarsest level that looks the same when drawn at px_per_unit output pixels per dataset unit
+        """
+        return select_lod(px_per_unit, tolerance, self._levels)
+
+    def for_scale(self, px_per_unit, tolerance=0.5):
+        return self[self.select_level(px_per_unit, tolerance)]
+
+    @property
+    def key(self):
+        """(category, index) identifying the drawing, e.g. for caching converted strokes
+        """
+        return self._dataset.resolve_name(self._name), self._index
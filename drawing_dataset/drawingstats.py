@@ -0,0 +1,57 @@
+from pathlib import Path
+import numpy as np
+
+# Per-drawing statistics used to estimate how long a drawing takes to render and print.
+# Every shard gets a <category>.qdi index next to it, a .npy file of one record per drawing.
+INDEX_SUFFIX = '.qdi'
+STATS_DTYPE = np.dtype([('strokes', '<u2'), ('points', '<u4'),
+                        ('xmin', 'u1'), ('ymin', 'u1'), ('xmax', 'u1'), ('ymax', 'u1'),
+                        ('length', '<f4'), ('ink', '<f4')])
+# pen width, in dataset units (0-255), assumed when estimating ink coverage
+INK_PEN_WIDTH = 4.0
+
+
+def drawing_stats(strokes):
+    """compute the statistics record of one drawing given as a sequence of (x, y) strokes
+    """
+    n_points = 0
+    length = 0.0
+    xmin = ymin = 255
+    xmax = ymax = 0
+    for stroke in strokes:
+        xy = np.asarray(stroke, dtype=np.float32)
+        if xy.shape[1] == 0:
+            continue
+        n_points += xy.shape[1]
+        length += float(np.hypot(*np.diff(xy, axis=1)).sum())
+        (x0, y0), (x1, y1) = xy.min(axis=1), xy.max(axis=1)
+        xmin, ymin, xmax, ymax = min(xmin, x0), min(ymin, y0), max(xmax, x1), max(ymax, y1)
+    if n_points == 0:
+        xmin = ymin = 0
+    ink = min(1.0, length * INK_PEN_WIDTH / 256 ** 2)
+    return len(strokes), n_points, xmin, ymin, xmax, ymax, length, ink
+
+
+def compute_stats(drawings):
+    """build the statistics array for a sequence of drawings
+    """
+    return np.array([drawing_stats(drawing) for drawing in drawings], dtype=STATS_DTYPE)
+
+
+def write_index(path, stats):
+    # write through a file object, np.save would otherwise append .npy to the name
+    with open(str(path), 'wb') as f:
+        np.save(f, np.asarray(stats, dtype=STATS_DTYPE), allow_pickle=False)
+
+
+def load_index(path):
+    """memory-map an index written by write_index
+    """
+    stats = np.load(str(path), mmap_mode='r', allow_pickle=False)
+    if stats.dtype != STATS_DTYPE:
+        raise ValueError('unexpected drawing index layout in {}'.format(str(path)))
+    return stats.view(np.ndarray)
+
+
+def index_path(shard_path):
+    return Path(shard_path).with_suffix(INDEX_SUFFIX)
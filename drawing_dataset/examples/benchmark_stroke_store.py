@@ -0,0 +1,69 @@
+"""Compare loading the whole quick draw dataset from pickles and from memory-mapped shards.
+
+Each backend runs in a fresh interpreter so the resident set sizes do not mix.
+
+    python3 drawing_dataset/examples/benchmark_stroke_store.py [path_to_dataset]
+"""
+import subprocess
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from drawing_dataset import DrawingDataset
+from drawing_dataset.strokestore import convert_pickles, SHARD_SUFFIX
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def open_dataset(path, backend):
+    dataset = DrawingDataset(path, os.path.join(DATA_DIR, 'label_mapping.jsonl'))
+    dataset.setup()
+    if backend == 'pickle':
+        # hide the shards so every category takes the fallback path
+        dataset.get_shard = lambda name, lod=0: None
+    return dataset
+
+
+def load_everything(path, backend):
+    dataset = open_dataset(path, backend)
+    rss_before = rss_mb()
+    t0 = time.perf_counter()
+    drawings = {name: dataset.load_drawings(name) for name in dataset.categories}
+    t1 = time.perf_counter()
+    points = 0
+    for images in drawings.values():
+        for i in range(len(images)):
+            for x, y in images[i]:
+                points += len(x)
+    t2 = time.perf_counter()
+    rss = rss_mb() - rss_before
+    # what the camera does: one get_drawing call per detected object. Loaded categories are cached, so the
+    # first call for a category, on a dataset that has not loaded it, is timed apart from later calls.
+    cold = open_dataset(path, backend)
+    t3 = time.perf_counter()
+    for name in cold.categories:
+        cold.get_drawing(name, 0)
+    t4 = time.perf_counter()
+    for i in range(200):
+        cold.get_drawing(cold.categories[i % len(cold.categories)], i % 100)
+    t5 = time.perf_counter()
+    print('{:>7}: load {:.3f} s, iterate {} points {:.3f} s, rss +{:.1f} MB, get_drawing first {:.3f} ms/category, '
+          'cached {:.3f} ms/call'.format(backend, t1 - t0, points, t2 - t1, rss,
+                                         (t4 - t3) * 1000 / len(cold.categories), (t5 - t4) * 1000 / 200))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        load_everything(sys.argv[1], sys.argv[2])
+        sys.exit(0)
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(DATA_DIR, 'quick_draw_pickles')
+    if not any(name.endswith(SHARD_SUFFIX) for name in os.listdir(path)):
+        convert_pickles(path)
+    for backend in ('pickle', 'shard'):
+        subprocess.check_call([sys.executable, __file__, path, backend])
@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import gzip
+import json
+import logging
+from .drawingstats import index_path
+from .strokestore import ShardWriter, SHARD_SUFFIX, build_lods, remove_lods
+
+
+def _open_ndjson(path):
+    if path.suffix == '.gz':
+        return gzip.open(str(path), 'rt', encoding='utf-8')
+    return open(str(path), encoding='utf-8')
+
+
+def category_name(path):
+    """category name of an upstream file, e.g. 'full_simplified_baseball bat.ndjson' -> 'baseball bat'
+    """
+    name = Path(path).name.split('.')[0]
+    for prefix in ('full_simplified_', 'full-simplified-', 'simplified_'):
+        if name.startswith(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def ingest_ndjson(path, dst_dir, recognized_only=True, max_drawings=None, lods=True):
+    """stream one simplified quick draw .ndjson file into a shard, one line at a time
+
+    :return: (category name, number of drawings written)
+    """
+    path = Path(path)
+    name = category_name(path)
+    logger = logging.getLogger('ingest')
+    skipped = 0
+    shard_path = Path(dst_dir) / (name + SHARD_SUFFIX)
+    with _open_ndjson(path) as lines, ShardWriter(shard_path) as writer:
+        for line in lines:
+            if max_drawings is not None and len(writer) >= max_drawings:
+                break
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if recognized_only and not record.get('recognized', True):
+                continue
+            try:
+                writer.add(record['drawing'])
+            except (KeyError, ValueError) as e:
+                # raw (unsimplified) records carry timestamps and coordinates outside 0-255
+                skipped += 1
+                logger.debug('{}: skipping {}: {}'.format(name, record.get('key_id'), e))
+        written = len(writer)
+    if written == 0:
+        # an empty shard would hide the category's pickle, if there is one
+        shard_path.unlink()
+        index_path(shard_path).unlink()
+        remove_lods(shard_path)
+    elif lods:
+        build_lods(shard_path)
+    else:
+        # levels of detail of an earlier ingest would be served for the new drawings
+        remove_lods(shard_path)
+    if skipped:
+        logger.warning('{}: skipped {} malformed drawings'.format(name, skipped))
+    logger.info('{}: {} drawings'.format(name, written))
+    return name, written
+
+
+def ingest_directory(src_dir, dst_dir, recognized_only=True, max_drawings=None, processes=None, lods=True):
+    """ingest every .ndjson (or .ndjson.gz) file in src_dir, one category per worker process
+
+    :return: dict of category name to number of drawings written
+    """
+    files = sorted(f for f in Path(src_dir).iterdir() if f.name.endswith(('.ndjson', '.ndjson.gz')))
+    Path(dst_dir).mkdir(parents=True, exist_ok=True)
+    sizes = dict()
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [executor.submit(ingest_ndjson, f, dst_dir, recognized_only, max_drawings, lods) for f in files]
+        for future in futures:
+            name, written = future.result()
+            sizes[name] = written
+    return sizes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='build stroke shards from simplified quick draw .ndjson files')
+    parser.add_argument('src_dir', help='directory of <category>.ndjson files')
+    parser.add_argument('dst_dir', help='dataset directory to write <category>.qds shards to')
+    parser.add_argument('--include_unrecognized', action='store_true',
+                        help='keep drawings the quick draw game did not recognise')
+    parser.add_argument('--max_drawings', type=int, default=None, help='maximum drawings per category')
+    parser.add_argument('--processes', type=int, default=None, help='worker processes, defaults to cpu count')
+    parser.add_argument('--no_lods', action='store_true', help='skip building simplified levels of detail')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    ingest_directory(args.src_dir, args.dst_dir, recognized_only=not args.include_unrecognized,
+                     max_drawings=args.max_drawings, processes=args.processes, lods=not args.no_lods)
@@ -0,0 +1,89 @@
+from pathlib import Path
+import numpy as np
+
+# Simplification tolerance, in dataset units (0-255), of each level of detail. Level 0 is the
+# unmodified drawing in <category>.qds, level k > 0 is stored in <category>.lod<k>.qds.
+LOD_EPSILONS = (0.0, 0.5, 1.0, 2.0, 4.0)
+LOD_INFIX = '.lod'
+
+
+def lod_shard_path(shard_path, level):
+    shard_path = Path(shard_path)
+    if level == 0:
+        return shard_path
+    return shard_path.with_name('{}{}{}{}'.format(shard_path.stem, LOD_INFIX, level, shard_path.suffix))
+
+
+def select_lod(px_per_unit, tolerance=0.5, levels=len(LOD_EPSILONS)):
+    """coarsest level whose simplification error stays under tolerance pixels at the given scale
+    """
+    level = 0
+    for k in range(1, levels):
+        if LOD_EPSILONS[k] * px_per_unit <= tolerance:
+            level = k
+    return level
+
+
+def rdp_mask(points, starts, ends, epsilon):
+    """Ramer-Douglas-Peucker over several polylines at once.
+
+    All open segments are split in the same pass, so each pass is a handful of array operations
+    however many strokes and segments there are.
+
+    :param points: Nx2 float array of every polyline's points concatenated
+    :param starts: index of the first point of each polyline
+    :param ends: index of the last point of each polyline
+    :return: boolean mask of the points to keep
+    """
+    keep = np.zeros(len(points), dtype=bool)
+    keep[starts] = True
+    keep[ends] = True
+    starts = np.asarray(starts)
+    ends = np.asarray(ends)
+    while len(starts):
+        lengths = ends - starts - 1
+        open_ = lengths > 0
+        starts, ends, lengths = starts[open_], ends[open_], lengths[open_]
+        if not len(starts):
+            break
+        # interior point indices of every segment, and the segment each belongs to
+        segment = np.repeat(np.arange(len(starts)), lengths)
+        first = np.cumsum(lengths) - lengths
+        idx = starts[segment] + 1 + np.arange(len(segment)) - first[segment]
+        a = points[starts[segment]]
+        ab = points[ends[segment]] - a
+        ap = points[idx] - a
+        # distance to the segment, so closed strokes (a == b) are measured from the end point
+        ab_len2 = np.einsum('ij,ij->i', ab, ab)
+        t = np.clip(np.einsum('ij,ij->i', ap, ab) / np.where(ab_len2 > 0, ab_len2, 1), 0, 1)
+        dist = np.hypot(*(ap - t[:, None] * ab).T)
+        # furthest point of each segment
+        seg_max = np.maximum.reduceat(dist, first)
+        split = seg_max > epsilon
+        at_max = dist == seg_max[segment]
+        at_max &= split[segment]
+        # first point reaching the maximum in each split segment
+        candidates = np.flatnonzero(at_max)
+        _, unique = np.unique(segment[candidates], return_index=True)
+        pivots = idx[candidates[unique]]
+        keep[pivots] = True
+        starts, ends = starts[split], ends[split]
+        starts, ends = np.concatenate([starts, pivots]), np.concatenate([pivots, ends])
+    return keep
+
+
+def simplify_drawing(strokes, epsilon):
+    """simplify every stroke of a drawing with a tolerance of epsilon dataset units
+
+    :return: list of 2xN uint8 (x, y) arrays
+    """
+    strokes = [np.asarray(stroke) for stroke in strokes]
+    if epsilon <= 0 or not strokes:
+        return strokes
+    sizes = np.array([stroke.shape[1] for stroke in strokes])
+    ends = np.cumsum(sizes) - 1
+    starts = ends - sizes + 1
+    valid = sizes > 0
+    points = np.concatenate([stroke.T for stroke in strokes]).astype(np.float32)
+    keep = rdp_mask(points, starts[valid], ends[valid], epsilon)
+    return [stroke[:, keep[start:end + 1]] for stroke, start, end in zip(strokes, starts, ends)]
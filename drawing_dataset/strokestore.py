@@ -0,0 +1,210 @@
+from pathlib import Path
+import argparse
+import logging
+import mmap
+import pickle
+import shutil
+import struct
+import tempfile
+import numpy as np
+from .drawingstats import drawing_stats, index_path, write_index
+from .simplify import LOD_EPSILONS, lod_shard_path, simplify_drawing
+
+# A shard holds every drawing of one category in a single file:
+#
+#   header          magic, drawing count, stroke count, point count
+#   drawing table   uint32[drawings + 1], first stroke of each drawing
+#   stroke table    uint32[strokes + 1], first point of each stroke
+#   coordinates     uint8[2 * points], each stroke stored as its x run then its y run
+#
+# so a stroke is a contiguous 2xN block that can be handed out as a view of the memory map.
+SHARD_SUFFIX = '.qds'
+SHARD_MAGIC = b'QDSTORE1'
+HEADER = struct.Struct('<8sIII4x')
+
+
+class StrokeShard(object):
+    """read-only memory-mapped view of one category of drawings
+    """
+
+    def __init__(self, path):
+        self._path = Path(path)
+        # plain ndarray view of the map: slicing np.memmap itself is several times slower
+        self._buffer = np.memmap(str(self._path), dtype=np.uint8, mode='r').view(np.ndarray)
+        magic, n_drawings, n_strokes, n_points = HEADER.unpack_from(self._buffer, 0)
+        if magic != SHARD_MAGIC:
+            raise ValueError('not a stroke shard: {}'.format(str(self._path)))
+        start = HEADER.size
+        end = start + 4 * (n_drawings + 1)
+        self._drawing_offsets = self._buffer[start:end].view('<u4')
+        start, end = end, end + 4 * (n_strokes + 1)
+        self._stroke_offsets = self._buffer[start:end].view('<u4')
+        self._coords = self._buffer[end:end + 2 * n_points]
+        self._num_drawings = n_drawings
+
+    def __len__(self):
+        return self._num_drawings
+
+    def get_drawing(self, index):
+        """get a drawing as a list of 2xN uint8 (x, y) arrays, each a view of the file
+        """
+        first, last = self._drawing_offsets[index:index + 2].tolist()
+        starts = self._stroke_offsets[first:last + 1].tolist()
+        return [self._coords[2 * a:2 * b].reshape(2, -1) for a, b in zip(starts[:-1], starts[1:])]
+
+    def __getitem__(self, index):
+        return self.get_drawing(index)
+
+    def preload(self):
+        """fault every page of the file into memory
+        """
+        return int(self._buffer[::mmap.PAGESIZE].sum())
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def coords(self):
+        return self._coords
+
+
+class ShardWriter(object):
+    """append drawings one at a time and write them out as a shard
+
+    Tables and coordinates are spooled to temporary files as they arrive, so memory use does not grow
+    with the number of drawings written. Only the small per-drawing statistics record is kept in memory,
+    it is written to the shard's .qdi index on close.
+    """
+
+    def __init__(self, path, index=True):
+        """
+        :param index: write the .qdi index, drawings are only selected by cost from the full detail shard
+        """
+        self._path = Path(path)
+        self._index = index
+        self._drawings = tempfile.TemporaryFile()
+        self._strokes = tempfile.TemporaryFile()
+        self._coords = tempfile.TemporaryFile()
+        self._num_drawings = 0
+        self._num_strokes = 0
+        self._num_points = 0
+        self._stats = []
+        self._drawings.write(struct.pack('<I', 0))
+        self._strokes.write(struct.pack('<I', 0))
+
+    def add(self, strokes):
+        """append a drawing given as a sequence of (x, y) strokes with coordinates in 0-255
+        """
+        strokes = [np.asarray(stroke) for stroke in strokes]
+        # validate the whole drawing first so a bad stroke cannot leave a partial drawing behind
+        for xy in strokes:
+            if xy.ndim != 2 or xy.shape[0] != 2:
+                raise ValueError('stroke should be a pair of x and y coordinate sequences')
+            if xy.size and (xy.min() < 0 or xy.max() > 255):
+                raise ValueError('stroke coordinates should be in range (0, 255)')
+        for xy in strokes:
+            self._coords.write(xy.astype(np.uint8).tobytes())
+            self._num_points += xy.shape[1]
+            self._num_strokes += 1
+            self._strokes.write(struct.pack('<I', self._num_points))
+        self._num_drawings += 1
+        self._drawings.write(struct.pack('<I', self._num_strokes))
+        if self._index:
+            self._stats.append(drawing_stats(strokes))
+
+    def close(self):
+        """assemble the shard file and release the temporary files
+        """
+        tmp_path = self._path.with_suffix(self._path.suffix + '.tmp')
+        with open(str(tmp_path), 'wb') as f:
+            f.write(HEADER.pack(SHARD_MAGIC, self._num_drawings, self._num_strokes, self._num_points))
+            for part in (self._drawings, self._strokes, self._coords):
+                part.seek(0)
+                shutil.copyfileobj(part, f)
+                part.close()
+        if self._index:
+            write_index(index_path(self._path), self._stats)
+        tmp_path.replace(self._path)
+        return self._path
+
+    def __len__(self):
+        return self._num_drawings
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            for part in (self._drawings, self._strokes, self._coords):
+                part.close()
+
+
+def remove_lods(shard_path):
+    """delete the levels of detail next to a shard, which would no longer match a rewritten or removed shard
+
+    :return: number of deleted level of detail shards
+    """
+    level = 1
+    while lod_shard_path(shard_path, level).exists():
+        lod_shard_path(shard_path, level).unlink()
+        level += 1
+    return level - 1
+
+
+def build_lods(shard_path):
+    """write every level of detail of a shard next to it
+
+    :return: list of written shard paths
+    """
+    # drops levels left over from an older LOD_EPSILONS with more levels
+    remove_lods(shard_path)
+    shard = StrokeShard(shard_path)
+    logger = logging.getLogger('build_lods')
+    written = []
+    for level in range(1, len(LOD_EPSILONS)):
+        # drawings keep their index across levels, so the full detail shard's .qdi covers them all
+        with ShardWriter(lod_shard_path(shard_path, level), index=False) as writer:
+            for i in range(len(shard)):
+                writer.add(simplify_drawing(shard.get_drawing(i), LOD_EPSILONS[level]))
+        written.append(lod_shard_path(shard_path, level))
+    logger.info('{}: {} levels of detail'.format(Path(shard_path).stem, len(written)))
+    return written
+
+
+def convert_pickles(src_dir, dst_dir=None, lods=True):
+    """convert every <category>.p pickle in src_dir into a <category>.qds shard, plus its levels of detail
+
+    :return: list of written shard paths
+    """
+    src_dir = Path(src_dir)
+    dst_dir = src_dir if dst_dir is None else Path(dst_dir)
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    logger = logging.getLogger('convert_pickles')
+    written = []
+    for pickle_file in sorted(src_dir.glob('*.p')):
+        with open(str(pickle_file), 'rb') as f:
+            drawings = pickle.load(f)
+        shard_path = dst_dir / (pickle_file.stem + SHARD_SUFFIX)
+        with ShardWriter(shard_path) as writer:
+            for drawing in drawings:
+                writer.add(drawing)
+        logger.info('{}: {} drawings'.format(pickle_file.stem, len(drawings)))
+        written.append(shard_path)
+        if lods:
+            written.extend(build_lods(shard_path))
+        else:
+            remove_lods(shard_path)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='convert quick draw pickles into memory-mapped stroke shards')
+    parser.add_argument('src_dir', help='directory containing <category>.p pickles')
+    parser.add_argument('--dst_dir', help='output directory, defaults to src_dir', default=None)
+    parser.add_argument('--no_lods', action='store_true', help='skip building simplified levels of detail')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    convert_pickles(args.src_dir, args.dst_dir, lods=not args.no_lods)
@@ -6,4 +6,6 @@ sudo apt install -y libasound-dev portaudio19-dev libportaudio2 libportaudiocpp0
 echo "Installing python dependencies"
 sudo pip3 install -r ./requirements.txt
 # TensorFlow object detection dependencies
+echo "Packing drawing dataset into memory-mapped shards"
+python3 -m drawing_dataset.strokestore ./data/quick_draw_pickles
 echo ">>>> Install finished <<<<"
\ No newline at end of file
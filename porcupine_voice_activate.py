@@ -12,12 +12,12 @@ import pyaudio
 import soundfile
 
 from porcupine import Porcupine
-from ThermalPrinter import Adafruit_Thermal
+from ThermalPrinter import Adafruit_Thermal, PrintSpooler
 
 import cv2 # For webcam
 from image_processor import ImageProcessor
 from drawing_dataset import DrawingDataset
-from sketch import SketchGizeh
+from sketch import SketchGizeh, quantize, scene_seed
 from PIL import Image
 
 from raspberry_io import RaspberryIO
@@ -32,6 +32,8 @@ class PorcupineDemo(Thread):
     # Set up camera constants
     IM_WIDTH = 640
     IM_HEIGHT = 480
+    # seconds allowed for drawing a sketch, crowded scenes drop detail and then objects to stay within it
+    RENDER_BUDGET = 1.0
     def __init__(
             self,
             library_path,
@@ -70,6 +72,10 @@ class PorcupineDemo(Thread):
             self._recorded_frames = []
             
         self._printer = Adafruit_Thermal(printer_serial_port, printer_baudrate)
+        # prints run on the spooler's thread, so the voice loop can take the next command while one prints
+        self._spooler = PrintSpooler(self._printer)
+        # job submitted last, the only one whose end means the printer has nothing left to do
+        self._lastPrinting = None
         self._pendingPrint = False
         self._pendingEdgePrint = False
         self.detect = ImageProcessor()
@@ -77,6 +83,8 @@ class PorcupineDemo(Thread):
         self.dataset = DrawingDataset('./data/quick_draw_pickles/', './data/label_mapping.jsonl')
         self.dataset.setup()
         self.sk = SketchGizeh()
+        self.sk.setup(renderer='raster')
+        self.sk.build_person_templates(self.dataset)
 
     def run(self):
         """
@@ -150,23 +158,22 @@ class PorcupineDemo(Thread):
                 if self._pendingPrint is True:
                     # LED on to show the Pi is taking photos.
                     self.io.led_on()
-                    self.run_camera()
+                    printing = self.run_camera()
                     self._pendingPrint = False
-                    # Pulse LED to show the Pi is ready for voice command.
-                    self.io.led_pulse()
+                    self._show_printing(printing)
                 if self._pendingEdgePrint is True:
                     # LED on to show the Pi is taking photos.
                     self.io.led_on()
-                    self.run_edge_camera()
+                    printing = self.run_edge_camera()
                     self._pendingEdgePrint = False
-                    # Pulse LED to show the Pi is ready for voice command.
-                    self.io.led_pulse()
+                    self._show_printing(printing)
 
                 time.sleep(0.1)
 
         except KeyboardInterrupt:
             print('stopping ...')
         finally:
+            self._spooler.close(cancel_pending=True)
             del self.io
             if audio_stream is not None:
                 audio_stream.stop_stream()
@@ -186,6 +193,19 @@ class PorcupineDemo(Thread):
     def setPendingPrint(self):
         self._pendingPrint=True
 
+    def _show_printing(self, printing):
+        # Blink LED while the print job runs, then pulse to show the Pi is ready for voice command.
+        # Commands are taken while it blinks, their prints queue up behind this one, so only the end of
+        # the last submitted job brings the pulse back.
+        self._lastPrinting = printing
+        self.io.led_blink()
+        print('printing, done in about {:.0f} s'.format(self._spooler.eta(printing)))
+        printing.add_done_callback(self._printingDone)
+
+    def _printingDone(self, printing):
+        if printing is self._lastPrinting:
+            self.io.led_pulse()
+
     def run_camera(self):
         camera = cv2.VideoCapture(0)
         if ((camera == None) or (not camera.isOpened())):
@@ -206,22 +226,31 @@ class PorcupineDemo(Thread):
             ret, frame = camera.read()
             frame_count += 1
             (boxes, scores, classes, num) = self.detect.detect(frame)
+            # boxes snapped to a coarse grid and drawings seeded from the scene, so the same scene captured
+            # again makes the same sketch and comes out of the render cache
+            boxes = quantize(np.squeeze(boxes))
+            classes = np.squeeze(classes).astype(np.int32)
+            scores = np.squeeze(scores)
+            # detections come ordered by score, which can swap between captures, plan them in a fixed order
+            order = np.lexsort(np.column_stack([classes, boxes]).T[::-1])
+            boxes, classes, scores = boxes[order], classes[order], scores[order]
+            seed = scene_seed(boxes, classes, scores)
+            # load the drawings the sketch will use while the canvas is being set up
+            self.sk.prefetch_object_recognition_results(boxes, classes, scores, self.detect.labels, self.dataset)
             # save image
             # cv2.imwrite('./image.jpg', frame)
-            self.sk.setup()
-            drawn_objects = self.sk.draw_object_recognition_results(np.squeeze(boxes),
-                                            np.squeeze(classes).astype(np.int32),
-                                            np.squeeze(scores),
-                                            self.detect.labels,
-                                            self.dataset)
+            placements = self.sk.plan_object_recognition_results(boxes, classes, scores, self.detect.labels,
+                                                                 self.dataset, seed=seed)
             print('frame:', frame_count)
-            if len(drawn_objects) > 0:
+            if len(placements) > 0:
                 camera.release()
-                print(drawn_objects)
-                img = Image.fromarray(self.sk.get_npimage())
-                self._printer.printImage(img, LaaT=True, reverse = False, rotate=True, auto_resize = True)
-                self._printer.feed(2)
-                break
+                placements = self.sk.layout(placements)
+                # only the frame that gets printed is rendered, straight into a printer resolution bitmap,
+                # and a scene identical to an earlier one is not rendered again
+                self.sk.setup(renderer='raster')
+                sketch = self.sk.render_cached(placements, self.dataset, seed=seed, budget=self.RENDER_BUDGET)
+                print(sketch.drawn_objects)
+                return self._spooler.print_bitmap(sketch.width, sketch.height, sketch.bitmap, LaaT='auto', feed=2)
 
     def run_edge_camera(self):
         camera = cv2.VideoCapture(0)
@@ -244,8 +273,9 @@ class PorcupineDemo(Thread):
         kernel = np.ones((2,2),np.uint8)
         frame = cv2.dilate(frame,kernel,iterations = 2)
         img = Image.fromarray(frame)
-        self._printer.printImage(img, LaaT=True, reverse = True, rotate=True, auto_resize = True)
-        self._printer.feed(2)
+        options = dict(LaaT='auto', reverse=True, rotate=True, auto_resize=True, dither='threshold')
+        return self._spooler.print_image(img, feed=2, seconds=self._printer.estimateImage(img, **options).seconds,
+                                         **options)
 
     _AUDIO_DEVICE_INFO_KEYS = ['index', 'name', 'defaultSampleRate', 'maxInputChannels']
 
@@ -1 +1,2 @@
-from .sketchgizeh import SketchGizeh
\ No newline at end of file
+from .sketchgizeh import SketchGizeh, Placement, RenderReport
+from .rendercache import RenderCache, RenderedSketch, quantize, scene_seed
\ No newline at end of file
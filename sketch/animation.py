@@ -0,0 +1,147 @@
+import os
+import queue
+import threading
+import numpy as np
+import cv2
+
+
+class StrokeAnimator(object):
+    """turns the strokes recorded by a VectorCanvas into the frames of the sketch being drawn.
+
+    Frames come from a single persistent canvas: each one only adds the next px_per_frame pixels of stroke
+    to what is already there, so the whole animation costs time linear in the total stroke length rather
+    than redrawing every stroke for every frame.
+    """
+
+    def __init__(self, canvas, px_per_frame=25.0, scale=1.0, antialias=True):
+        """
+        :param canvas: VectorCanvas, e.g. SketchGizeh's after rendering with the 'vector' renderer
+        :param px_per_frame: canvas pixels of stroke added per frame, i.e. the drawing speed
+        :param scale: video pixels per canvas pixel
+        """
+        if px_per_frame <= 0:
+            raise ValueError('px_per_frame should be positive')
+        self._canvas = canvas
+        self._step = float(px_per_frame)
+        self._scale = scale
+        self._line_type = cv2.LINE_AA if antialias else cv2.LINE_8
+        width, height = canvas.size
+        self._size = (int(round(width * scale)), int(round(height * scale)))
+
+    # cv2 draws with fixed point coordinates, 4 fractional bits keep sub-pixel accuracy
+    SHIFT = 4
+
+    @property
+    def size(self):
+        """width, height of the frames"""
+        return self._size
+
+    def frames(self):
+        """generate the frames, BGR uint8 images. Each is the same array drawn on further, copy it to keep it.
+        """
+        image = np.empty((self._size[1], self._size[0], 3), dtype=np.uint8)
+        image[:] = _bgr(self._canvas.bg_color)
+        emitted = 0
+        drawn = 0.0
+        for width, color, polylines in self._canvas.paths:
+            color = _bgr(color)
+            thickness = max(1, int(round(width * self._scale)))
+            for points in polylines:
+                fixed = np.round(np.asarray(points, dtype=np.float64) * self._scale * (1 << self.SHIFT))
+                fixed = fixed.astype(np.int32)
+                if len(fixed) == 1:
+                    # a dot adds no length, it goes into the frame being drawn
+                    cv2.polylines(image, [np.concatenate([fixed, fixed])], False, color, thickness=thickness,
+                                  lineType=self._line_type, shift=self.SHIFT)
+                    continue
+                # frame each segment ends in, from the stroke length drawn up to its end
+                ends = drawn + np.cumsum(np.hypot(*np.diff(points, axis=0).T))
+                frame = (ends // self._step).astype(np.int64)
+                drawn = ends[-1]
+                # runs of segments ending in the same frame are drawn as one polyline
+                breaks = np.flatnonzero(np.diff(frame)) + 1
+                for start, stop in zip(np.concatenate([[0], breaks]), np.concatenate([breaks, [len(frame)]])):
+                    while emitted < frame[start]:
+                        yield image
+                        emitted += 1
+                    cv2.polylines(image, [fixed[start:stop + 1]], False, color, thickness=thickness,
+                                  lineType=self._line_type, shift=self.SHIFT)
+        yield image
+
+    def write_video(self, path, fps=30, fourcc='mp4v', hold=1.0, queue_size=8):
+        """write the animation to a video file with an OpenCV VideoWriter
+
+        :param hold: seconds the finished sketch stays on screen at the end
+        :param queue_size: frames allowed to wait for the encoder, which runs on its own thread
+        :return: number of frames written
+        """
+        writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, self._size)
+        if not writer.isOpened():
+            raise IOError('cannot open video writer for {}'.format(path))
+        try:
+            return _write_queued(self._held(self.frames(), int(round(hold * fps))), writer.write, queue_size)
+        finally:
+            writer.release()
+
+    def write_images(self, directory, pattern='frame_{:05d}.png', hold_frames=0, queue_size=8):
+        """write the animation as numbered image files
+
+        :param hold_frames: extra copies of the finished sketch to write at the end
+        :return: number of frames written
+        """
+        os.makedirs(str(directory), exist_ok=True)
+        count = [0]
+
+        def write(image):
+            cv2.imwrite(os.path.join(str(directory), pattern.format(count[0])), image)
+            count[0] += 1
+        return _write_queued(self._held(self.frames(), hold_frames), write, queue_size)
+
+    @staticmethod
+    def _held(frames, hold_frames):
+        image = None
+        for image in frames:
+            yield image
+        for _ in range(hold_frames):
+            yield image
+
+
+def _write_queued(frames, write, queue_size):
+    """hand frames to write on a consumer thread through a bounded queue, so drawing the next frame overlaps
+    encoding the last while at most queue_size frames are held in memory
+    """
+    frames_queue = queue.Queue(maxsize=queue_size)
+    errors = []
+    done = object()
+
+    def consume():
+        while True:
+            image = frames_queue.get()
+            if image is done:
+                return
+            if not errors:
+                try:
+                    write(image)
+                except Exception as e:
+                    errors.append(e)
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    count = 0
+    try:
+        for image in frames:
+            if errors:
+                break
+            # the animator keeps drawing on the same array, the queue gets a snapshot
+            frames_queue.put(image.copy())
+            count += 1
+    finally:
+        frames_queue.put(done)
+        consumer.join()
+    if errors:
+        raise errors[0]
+    return count
+
+
+def _bgr(color):
+    return tuple(int(round(255 * min(max(c, 0), 1))) for c in reversed(tuple(color)[:3]))
@@ -0,0 +1,50 @@
+"""Time resolve_overlaps on random scenes and report how much overlap it leaves.
+
+    python3 sketch/examples/benchmark_layout.py [scenes] [objects_per_scene] [min_scale] [max_scale]
+"""
+import random
+import sys
+import os
+import time
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from sketch import Placement
+from sketch.layout import footprint, resolve_overlaps
+
+WIDTH, HEIGHT = 1200, 900
+
+
+def make_scenes(count, objects, min_scale, max_scale, seed=1):
+    rng = random.Random(seed)
+    return [[Placement(rng.choice(['person', 'cat']), (), (rng.random(), rng.random()),
+                       rng.uniform(min_scale, max_scale), rng.random()) for _ in range(objects)]
+            for _ in range(count)]
+
+
+def overlap_area(placements):
+    xs = np.array([p.position[0] * WIDTH for p in placements])
+    ys = np.array([p.position[1] * HEIGHT for p in placements])
+    half_x, half_y = np.array([footprint(p, WIDTH, HEIGHT) for p in placements]).T
+    first, second = np.triu_indices(len(placements), 1)
+    overlap_x = np.maximum(half_x[first] + half_x[second] - np.abs(xs[first] - xs[second]), 0)
+    overlap_y = np.maximum(half_y[first] + half_y[second] - np.abs(ys[first] - ys[second]), 0)
+    return float((overlap_x * overlap_y).sum())
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    objects = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    min_scale = float(sys.argv[3]) if len(sys.argv) > 3 else 0.1
+    max_scale = float(sys.argv[4]) if len(sys.argv) > 4 else 0.5
+    times, before, after, clean = [], 0.0, 0.0, 0
+    for scene in make_scenes(count, objects, min_scale, max_scale):
+        t0 = time.perf_counter()
+        resolved = resolve_overlaps(scene, WIDTH, HEIGHT)
+        times.append((time.perf_counter() - t0) * 1000)
+        before += overlap_area(scene)
+        remaining = overlap_area(resolved)
+        after += remaining
+        clean += remaining == 0
+    print('{} scenes of {} objects: median {:.2f} ms, p90 {:.2f} ms, max {:.2f} ms; overlap left {:.1%}, '
+          '{} scenes without overlap'.format(count, objects, np.median(times), np.percentile(times, 90),
+                                             max(times), after / before if before else 0.0, clean))
@@ -0,0 +1,67 @@
+"""Compare the two ways of getting a sketch to the printer:
+
+ gizeh:  1200x900 cairo surface -> get_npimage -> printImage (rotate, 1-bit dither, resize, pack)
+ raster: RasterCanvas at 384 dots wide, already rotated -> packbits
+
+    python3 sketch/examples/benchmark_raster_renderer.py [scenes] [objects_per_scene]
+"""
+import contextlib
+import io
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from PIL import Image
+from drawing_dataset import DrawingDataset
+from sketch import SketchGizeh
+from ThermalPrinter import Adafruit_Thermal
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+
+
+class PackOnlyPrinter(Adafruit_Thermal):
+    """runs printImage's conversion and packing but sends nothing"""
+
+    def printBitmap(self, w, h, bitmap, LaaT=False, trim=False):
+        self.packed = bitmap
+
+
+def make_scenes(dataset, count, objects):
+    rng = random.Random(0)
+    scenes = []
+    for _ in range(count):
+        scene = []
+        for _ in range(objects):
+            name = rng.choice(dataset.categories)
+            scene.append((name, rng.randrange(dataset.num_drawings(name)),
+                          rng.uniform(0.1, 0.5), [rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8)]))
+        scenes.append(scene)
+    return scenes
+
+
+def run(sk, renderer, dataset, scenes, printer):
+    t0 = time.perf_counter()
+    for scene in scenes:
+        sk.setup(renderer=renderer)
+        for name, index, scale, pos in scene:
+            sk.draw(dataset.get_drawing_lods(name, index), scale=scale, pos=list(pos))
+        if renderer == 'raster':
+            sk.get_bitmap()
+        else:
+            printer.printImage(Image.fromarray(sk.get_npimage()), LaaT=True, rotate=True, auto_resize=True)
+    return (time.perf_counter() - t0) / len(scenes)
+
+
+if __name__ == '__main__':
+    n_scenes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    dataset = DrawingDataset(os.path.join(DATA_DIR, 'quick_draw_pickles'), os.path.join(DATA_DIR, 'label_mapping.jsonl'))
+    dataset.setup()
+    scenes = make_scenes(dataset, n_scenes, n_objects)
+    with contextlib.redirect_stdout(io.StringIO()):
+        printer = PackOnlyPrinter()
+    sk = SketchGizeh()
+    for renderer in ('gizeh', 'raster'):
+        print('{:>6}: {:.1f} ms per {} object sketch'.format(renderer, 1000 * run(sk, renderer, dataset, scenes, printer),
+                                                            n_objects))
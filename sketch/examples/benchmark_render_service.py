@@ -0,0 +1,54 @@
+"""Render a batch of random sketches one after another, then through RenderService.
+
+    python3 sketch/examples/benchmark_render_service.py [sketches] [workers] [renderer]
+"""
+import random
+import sys
+import os
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from drawing_dataset import DrawingDataset
+from sketch import SketchGizeh, Placement
+from sketch.renderservice import RenderJob, RenderService
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+DATASET = os.path.join(DATA_DIR, 'quick_draw_pickles')
+LABEL_MAPPING = os.path.join(DATA_DIR, 'label_mapping.jsonl')
+
+
+def make_jobs(dataset, count, renderer, objects=8):
+    rng = random.Random(0)
+    jobs = []
+    for _ in range(count):
+        placements = []
+        for _ in range(objects):
+            name = rng.choice(dataset.categories)
+            placements.append(Placement(name, ((name, rng.randrange(dataset.num_drawings(name))),),
+                                        (rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8)), rng.uniform(0.1, 0.4), 1.0))
+        jobs.append(RenderJob(placements, renderer=renderer))
+    return jobs
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    renderer = sys.argv[3] if len(sys.argv) > 3 else 'gizeh'
+    dataset = DrawingDataset(DATASET, LABEL_MAPPING)
+    dataset.setup()
+    jobs = make_jobs(dataset, count, renderer)
+
+    sk = SketchGizeh()
+    t0 = time.perf_counter()
+    for job in jobs:
+        sk.setup(job.width, job.height, renderer=job.renderer)
+        sk.render_cached(job.placements, dataset)
+    serial = time.perf_counter() - t0
+
+    with RenderService(DATASET, LABEL_MAPPING, workers=workers) as service:
+        # let the workers start and preload before timing
+        service.submit(jobs[0]).result()
+        t0 = time.perf_counter()
+        png_bytes = sum(len(sketch.png) for sketch in service.render(jobs, chunksize=4))
+        parallel = time.perf_counter() - t0
+    print('{} {} sketches: serial {:.2f} s, {} workers {:.2f} s ({:.1f}x), {:.0f} kB of PNG'.format(
+        count, renderer, serial, workers, parallel, serial / parallel, png_bytes / 1024))
@@ -0,0 +1,78 @@
+"""Export a gallery's worth of random sketches as PNG (gizeh, cairo raster) and as SVG and PDF (vector
+renderer), reporting CPU time and bytes per sketch.
+
+    python3 sketch/examples/benchmark_vector_export.py [sketches] [objects_per_sketch]
+"""
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from drawing_dataset import DrawingDataset
+from sketch import SketchGizeh, Placement
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), '../../data')
+
+
+def make_scenes(dataset, count, objects):
+    rng = random.Random(0)
+    scenes = []
+    for _ in range(count):
+        placements = []
+        for _ in range(objects):
+            name = rng.choice(dataset.categories)
+            placements.append(Placement(name, ((name, rng.randrange(dataset.num_drawings(name))),),
+                                        (rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8)), rng.uniform(0.1, 0.4), 1.0))
+        scenes.append(placements)
+    return scenes
+
+
+def export_png(sk):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sketch.png')
+        sk.save_png(path)
+        return os.path.getsize(path)
+
+
+def export_vector(save, decimals):
+    def export(sk):
+        out = io.BytesIO()
+        getattr(sk, save)(out, decimals=decimals)
+        return len(out.getvalue())
+    return export
+
+
+EXPORTS = [
+    ('png', 'gizeh', export_png),
+    ('svg', 'vector', export_vector('save_svg', 1)),
+    ('svg exact', 'vector', export_vector('save_svg', None)),
+    ('svg int', 'vector', export_vector('save_svg', 0)),
+    ('pdf', 'vector', export_vector('save_pdf', 1)),
+]
+
+
+def run(sk, renderer, export, dataset, scenes):
+    cpu = 0.0
+    size = 0
+    for placements in scenes:
+        sk.setup(renderer=renderer)
+        t0 = time.process_time()
+        sk.render(placements, dataset)
+        size += export(sk)
+        cpu += time.process_time() - t0
+    return cpu / len(scenes), size / len(scenes)
+
+
+if __name__ == '__main__':
+    n_scenes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_objects = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    dataset = DrawingDataset(os.path.join(DATA_DIR, 'quick_draw_pickles'), os.path.join(DATA_DIR, 'label_mapping.jsonl'))
+    dataset.setup()
+    scenes = make_scenes(dataset, n_scenes, n_objects)
+    sk = SketchGizeh()
+    for name, renderer, export in EXPORTS:
+        run(sk, renderer, export, dataset, scenes[:5])
+        cpu, size = run(sk, renderer, export, dataset, scenes)
+        print('{:>9}: {:6.2f} ms CPU, {:7.0f} bytes per {} object sketch'.format(name, 1000 * cpu, size, n_objects))
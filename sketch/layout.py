@@ -0,0 +1,86 @@
+import math
+import random
+import numpy as np
+
+# Drawings are 255 units square; a person is three parts stacked into a 255 x 750 unit figure whose
+# height is the placement scale (see SketchGizeh.draw and draw_person).
+PERSON_ASPECT = 255 / 750
+# extra distance, in canvas pixels, added to every push so touching drawings do not count as overlapping
+SLACK = 1.0
+# The pushes of one iteration are applied together, a pair's push ignoring the other pairs moving the same
+# objects. Overshooting each push like this settles in fewer iterations than applying them as they are.
+STEP = 1.6
+# iterations the total overlap may go without dropping by 1% before a scene is taken as too crowded
+STALL_ITERATIONS = 10
+
+
+def footprint(placement, width, height):
+    """half width and half height, in canvas pixels, of the area a placement draws into
+    """
+    side = placement.scale * (width + height) / 2
+    if placement.class_name == 'person':
+        return side * PERSON_ASPECT / 2, side / 2
+    return side / 2, side / 2
+
+
+def resolve_overlaps(placements, width=1200, height=900, iterations=50, padding=0.0, seed=0):
+    """move placements apart so their drawings do not overlap.
+
+    Each iteration tests every pair of footprints at once with NumPy and pushes each overlapping pair apart
+    along the line between their centres by the smaller of their overlaps, the lower scoring object taking
+    the larger share of the move. The pushes of an iteration are summed and applied together, scaled by
+    STEP, and objects are kept on the canvas. Stops as soon as nothing overlaps, once the total overlap has
+    not dropped for STALL_ITERATIONS iterations, so scenes too crowded to untangle give up early and keep
+    some overlap, or after a fixed number of iterations. Deterministic for a given seed.
+
+    :param padding: extra gap, in canvas pixels, to leave between drawings
+    :return: list of placements with updated positions, in the same order
+    """
+    n = len(placements)
+    if n < 2:
+        return list(placements)
+    rng = None
+    xs = np.array([p.position[0] for p in placements], dtype=np.float64) * width
+    ys = np.array([p.position[1] for p in placements], dtype=np.float64) * height
+    half_x, half_y = np.array([footprint(p, width, height) for p in placements], dtype=np.float64).T
+    weight = np.maximum([p.score for p in placements], 1e-3)
+    # every pair once, as index arrays; the 20 or so objects of a frame make a few hundred pairs
+    first, second = np.triu_indices(n, 1)
+    reach_x = half_x[first] + half_x[second] + padding
+    reach_y = half_y[first] + half_y[second] + padding
+    share = weight[second] / (weight[first] + weight[second])
+    # centre limits keeping each drawing on the canvas, or centred when it is larger than the canvas
+    low_x, high_x = np.minimum(half_x, width / 2), np.maximum(width - half_x, width / 2)
+    low_y, high_y = np.minimum(half_y, height / 2), np.maximum(height - half_y, height / 2)
+    least, stalled = math.inf, 0
+    for _ in range(iterations):
+        dx, dy = xs[second] - xs[first], ys[second] - ys[first]
+        overlap_x, overlap_y = reach_x - np.abs(dx), reach_y - np.abs(dy)
+        hit = np.flatnonzero((overlap_x > 0) & (overlap_y > 0))
+        if len(hit) == 0:
+            break
+        # push by the smaller overlap, so objects squeezed between two neighbours can still slide out sideways
+        overlap = np.minimum(overlap_x[hit], overlap_y[hit])
+        total = overlap.sum()
+        if total < 0.99 * least:
+            least, stalled = total, 0
+        else:
+            stalled += 1
+            if stalled >= STALL_ITERATIONS:
+                break
+        dx, dy = dx[hit], dy[hit]
+        distance = np.hypot(dx, dy)
+        same = distance == 0
+        if same.any():
+            # objects on the same spot go opposite ways in a random direction
+            rng = rng or random.Random(seed)
+            angle = np.array([rng.uniform(0, 2 * math.pi) for _ in range(int(same.sum()))])
+            dx[same], dy[same], distance[same] = np.cos(angle), np.sin(angle), 1.0
+        push = (overlap + SLACK) * STEP / distance
+        push_x, push_y, share_i = dx * push, dy * push, share[hit]
+        i, j = first[hit], second[hit]
+        xs += np.bincount(j, push_x - push_x * share_i, n) - np.bincount(i, push_x * share_i, n)
+        ys += np.bincount(j, push_y - push_y * share_i, n) - np.bincount(i, push_y * share_i, n)
+        np.minimum(np.maximum(xs, low_x, out=xs), high_x, out=xs)
+        np.minimum(np.maximum(ys, low_y, out=ys), high_y, out=ys)
+    return [p._replace(position=(x / width, y / height)) for p, x, y in zip(placements, xs.tolist(), ys.tolist())]
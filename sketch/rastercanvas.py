@@ -0,0 +1,79 @@
+import numpy as np
+import cv2
+from ThermalPrinter.dither import image_dots, pack
+
+
+class RasterCanvas(object):
+    """1-bit style canvas that rasterises strokes directly at the thermal printer's geometry.
+
+    Callers draw in the same canvas coordinates as the gizeh surface (width x height). Points are
+    rotated and scaled on the way in, so the buffer is already the image printImage would have produced
+    after rotating, thresholding and resizing, and packs straight into a printBitmap bitmap.
+    The buffer holds 1 where there is ink and 0 elsewhere.
+    """
+
+    def __init__(self, width=1200, height=900, printer_width=384, rotate=True):
+        self._width = width
+        self._height = height
+        self._rotate = rotate
+        # canvas pixels -> printer dots
+        self._scale = printer_width / (height if rotate else width)
+        rows = int(round((width if rotate else height) * self._scale))
+        self._buffer = np.zeros((rows, printer_width), dtype=np.uint8)
+        self._packed = bytearray(rows * ((printer_width + 7) // 8))
+
+    # cv2 draws with fixed point coordinates, 4 fractional bits keep sub-dot accuracy
+    SHIFT = 4
+
+    def clear(self):
+        self._buffer.fill(0)
+
+    def to_printer(self, points):
+        """map an Nx2 array of canvas coordinates to printer dots
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if self._rotate:
+            # same as PIL's rotate(90, expand=True): (x, y) -> (y, width - x)
+            points = np.column_stack((points[:, 1], self._width - points[:, 0]))
+        return points * self._scale
+
+    def draw_polylines(self, polylines, stroke_width=6, color=1):
+        """draw a list of Nx2 canvas coordinate arrays as open polylines
+        """
+        if not polylines:
+            return
+        fixed = [np.round(self.to_printer(p) * (1 << self.SHIFT)).astype(np.int32) for p in polylines]
+        thickness = max(1, int(round(stroke_width * self._scale)))
+        cv2.polylines(self._buffer, fixed, False, color, thickness=thickness, lineType=cv2.LINE_8, shift=self.SHIFT)
+
+    def get_npimage(self):
+        """8-bit greyscale image, black ink on white
+        """
+        return (1 - self._buffer) * 255
+
+    def get_bitmap(self):
+        """the canvas packed 8 dots per byte, MSB first, as Adafruit_Thermal.printBitmap expects
+
+        :return: width, height, bitmap
+        """
+        height, width = self._buffer.shape
+        self._packed[:] = np.packbits(self._buffer, axis=1).tobytes()
+        return width, height, self._packed
+
+    def save_png(self, path):
+        cv2.imwrite(str(path), self.get_npimage())
+
+    @property
+    def scale(self):
+        return self._scale
+
+
+def pack_image(image, printer_width=384, rotate=True):
+    """pack a canvas image into a printBitmap bitmap the way Adafruit_Thermal.imageToBitmap does with a numpy
+    image: dark pixels are dots, rotated like PIL's rotate(90, expand=True) and resized to printer_width
+    with nearest neighbour sampling, see ThermalPrinter.dither.image_dots.
+
+    :param image: uint8 greyscale or RGB array, e.g. from gizeh's get_npimage
+    :return: width, height, bitmap
+    """
+    return pack(image_dots(image, rotate=rotate, width=printer_width))
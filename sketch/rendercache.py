@@ -0,0 +1,91 @@
+from collections import OrderedDict, namedtuple
+import hashlib
+import numpy as np
+
+# A finished sketch: the objects drawn, the width and height in printer dots of the packed 1-bit bitmap for
+# Adafruit_Thermal.printBitmap, that bitmap and the PNG encoded image.
+RenderedSketch = namedtuple('RenderedSketch', ['drawn_objects', 'width', 'height', 'bitmap', 'png'])
+
+
+# Detector boxes and placements are normalised to the frame. Coordinates are snapped to this step, 1/50 of
+# the frame, so the same scene captured again, whose boxes jitter by a few pixels, gives the same plan seed
+# and the same placement key.
+POSITION_STEP = 0.02
+
+
+def quantize(values, step=POSITION_STEP):
+    """snap normalised coordinates, a number or an array, to multiples of step"""
+    return np.round(np.asarray(values, dtype=np.float64) / step) * step
+
+
+def scene_seed(boxes, classes, scores=None, threshold=0.5):
+    """seed for SketchGizeh.plan_object_recognition_results derived from the detections it draws: their
+    classes and boxes snapped to POSITION_STEP, in any order. The same scene always gets the same
+    drawings, so its render can come from the cache.
+    """
+    detections = sorted((int(classes[i]), tuple(_steps(v) for v in boxes[i]))
+                        for i in range(len(boxes)) if scores is None or scores[i] >= threshold)
+    return int(hashlib.sha1(repr(detections).encode('utf-8')).hexdigest()[:16], 16)
+
+
+def placement_key(placements, seed=None, settings=()):
+    """canonical hash of what a render depends on: the placements, the seed and the canvas settings.
+    Scores only decide what gets planned, so they are left out; positions and scales are snapped to
+    POSITION_STEP, like the boxes scene_seed is derived from.
+    """
+    canonical = (tuple((p.class_name, tuple(tuple(d) for d in p.drawings),
+                        tuple(_steps(v) for v in p.position), _steps(p.scale)) for p in placements),
+                 seed, tuple(settings))
+    return hashlib.sha1(repr(canonical).encode('utf-8')).hexdigest()
+
+
+def _steps(value):
+    return int(round(value / POSITION_STEP))
+
+
+class RenderCache(object):
+    """least recently used cache of RenderedSketch, bounded by the bytes of bitmap and PNG it holds
+    """
+
+    def __init__(self, max_bytes=8 * 2 ** 20):
+        self._max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(sketch):
+        return len(sketch.bitmap or b'') + len(sketch.png or b'')
+
+    def get(self, key):
+        sketch = self._entries.get(key)
+        if sketch is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return sketch
+
+    def put(self, key, sketch):
+        size = self._size(sketch)
+        if size > self._max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._size(self._entries.pop(key))
+        self._entries[key] = sketch
+        self._bytes += size
+        while self._bytes > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._size(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def bytes(self):
+        return self._bytes
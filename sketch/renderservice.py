@@ -0,0 +1,69 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from drawing_dataset import DrawingDataset
+from .sketchgizeh import SketchGizeh
+
+# One sketch to render: the placement plan plus how to render it. renderer is 'gizeh' or 'raster' (see
+# SketchGizeh.setup). If path is set, the worker also writes the PNG there.
+RenderJob = namedtuple('RenderJob', ['placements', 'width', 'height', 'renderer', 'seed', 'path'])
+RenderJob.__new__.__defaults__ = (1200, 900, 'gizeh', None, None)
+
+# per worker process state, set up once by _init_worker
+_worker_dataset = None
+_worker_sketch = None
+
+
+def _init_worker(path_to_drawing_dataset, path_to_label_mapping, preload):
+    global _worker_dataset, _worker_sketch
+    _worker_dataset = DrawingDataset(path_to_drawing_dataset, path_to_label_mapping)
+    _worker_dataset.setup()
+    if preload:
+        for future in _worker_dataset.prefetch(_worker_dataset.categories):
+            future.result()
+    _worker_sketch = SketchGizeh()
+
+
+def _render_job(job):
+    _worker_sketch.setup(job.width, job.height, renderer=job.renderer)
+    sketch = _worker_sketch.render_cached(job.placements, _worker_dataset, seed=job.seed)
+    if job.path is not None:
+        Path(job.path).write_bytes(sketch.png)
+    return sketch
+
+
+class RenderService(object):
+    """renders sketches on a pool of worker processes, each with its own preloaded DrawingDataset.
+
+    Jobs travel to the workers as compact placement plans and come back as RenderedSketch tuples of
+    PNG and packed bitmap bytes, so nothing heavier than that is pickled.
+    """
+
+    def __init__(self, path_to_drawing_dataset, path_to_label_mapping, workers=None, preload=True):
+        self._executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                             initargs=(str(path_to_drawing_dataset), str(path_to_label_mapping),
+                                                       preload))
+
+    def submit(self, job):
+        """render one RenderJob
+
+        :return: future of a RenderedSketch
+        """
+        return self._executor.submit(_render_job, job)
+
+    def render(self, jobs, chunksize=1):
+        """render RenderJobs in parallel
+
+        :return: iterator of RenderedSketch, in the order of jobs, each yielded as soon as it and every
+        job before it have finished
+        """
+        return self._executor.map(_render_job, jobs, chunksize=chunksize)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,85 +1,394 @@
+from collections import OrderedDict, namedtuple
 import numpy as np
 import sys
 import gizeh as gz
 import random
+import time
+import cv2
+from .layout import resolve_overlaps
+from .rastercanvas import RasterCanvas, pack_image
+from .animation import StrokeAnimator
+from .vectorexport import VectorCanvas
+from .rendercache import RenderCache, RenderedSketch, placement_key
+
+# Where and how one detected object will be drawn. drawings is a tuple of (name, index) pairs, one for a
+# plain object and one per PERSON_PARTS entry for a person. position is the normalised (x, y) centre and scale
+# the normalised size, as taken by SketchGizeh.draw and draw_person.
+Placement = namedtuple('Placement', ['class_name', 'drawings', 'position', 'scale', 'score'])
+# Outcome of SketchGizeh.render: class names drawn in full detail or at the coarsest level of detail, the
+# placements left out because the time budget ran out, and the seconds spent.
+RenderReport = namedtuple('RenderReport', ['drawn_objects', 'degraded', 'skipped', 'elapsed'])
 
 
 class SketchGizeh(object):
 
-    def __init__(self):
+    PERSON_PARTS = {'face': [0, 0], 't-shirt': [0, 250], 'pants': [0, 480]}  # dict of parts + translation
+
+    def __init__(self, drawing_budget=None, stroke_cache_size=256, render_cache_bytes=8 * 2 ** 20,
+                 person_templates=16):
+        """
+        :param drawing_budget: optional dict of limits passed to DrawingDataset.sample_drawing when picking
+        drawings, e.g. {'max_points': 150, 'max_ink': 0.05}, to bound render and print time per object.
+        :param stroke_cache_size: number of converted, unscaled drawings kept for repeat renders.
+        :param render_cache_bytes: memory allowed for finished sketches reused by render_cached.
+        :param person_templates: number of body part combinations people are drawn from, see person_template.
+        """
         self._surface = None
+        self._raster = None
+        self._vector = None
+        self._width = None
+        self._height = None
+        self._renderer = None
+        self._bg_color = None
+        self._stroke_cache = OrderedDict()
+        self._stroke_cache_size = stroke_cache_size
+        self._render_cache = RenderCache(render_cache_bytes)
+        self._coarsest_lod = False
+        self._person_templates = []
+        self._person_templates_size = person_templates
+        self._drawing_budget = drawing_budget or dict()
 
-    def setup(self, width=1200, height=900, bg_color=(1, 1, 1)):
+    def setup(self, width=1200, height=900, bg_color=(1, 1, 1), output_scale=1.0, renderer='gizeh'):
+        """
+        :param output_scale: final output pixels per canvas pixel, e.g. 384 / 900 when the canvas is printed
+        rotated on a 384 dot printer. Used to pick the coarsest level of detail that still looks the same.
+        :param renderer: 'gizeh' draws antialiased strokes on a cairo surface, 'raster' draws them straight
+        into a printer resolution bitmap (see RasterCanvas), in which case output_scale is set to match it.
+        'vector' only records the strokes, for save_svg and save_pdf (see VectorCanvas).
+        """
+        if (renderer == self._renderer and (width, height) == (self._width, self._height)
+                and (self._surface is not None or self._raster is not None or self._vector is not None)):
+            # same canvas as last time, wipe it rather than allocating a new one
+            self.clear(bg_color)
+            if renderer != 'raster':
+                self._output_scale = output_scale
+            return
         self._width = width
         self._height = height
-        self._surface = gz.Surface(width=width, height=height, bg_color=bg_color)
+        self._output_scale = output_scale
+        self._renderer = renderer
+        self._bg_color = bg_color
+        self._surface = self._raster = self._vector = None
+        if renderer == 'raster':
+            self._raster = RasterCanvas(width, height)
+            self._output_scale = self._raster.scale
+        elif renderer == 'gizeh':
+            self._surface = gz.Surface(width=width, height=height, bg_color=bg_color)
+        elif renderer == 'vector':
+            self._vector = VectorCanvas(width, height, bg_color)
+        else:
+            self._renderer = None
+            raise ValueError('unknown renderer {}'.format(renderer))
+
+    def clear(self, bg_color=None):
+        """wipe the canvas so it can be drawn again
+        """
+        if self._raster is not None:
+            self._raster.clear()
+        elif self._vector is not None:
+            self._vector.clear(bg_color)
+        else:
+            if bg_color is not None:
+                self._bg_color = bg_color
+            gz.rectangle(lx=self._width, ly=self._height, xy=(self._width / 2, self._height / 2),
+                         fill=self._bg_color).draw(self._surface)
 
     def draw(self, strokes, scale=1.0, pos=[0, 0], stroke_width=6, color=[0, 0, 0]):
         """iterate through a list of strokes, drawing them on the canvas
         pos is normalised coprdinates in range (0,1)
+        strokes can also be the levels of detail of a drawing (DrawingDataset.get_drawing_lods), in which case
+        the coarsest one that is visually lossless at this scale is drawn.
         """
         try:
             for val in pos:
                 if val < 0 or val > 1 or not isinstance(val, float):
                     raise ValueError('position coordinates should be float between (0,1)')
             scale *= np.mean([self._width, self._height]) / 255
+            load, key = self._select_lod(strokes, scale)
             pos[0] = pos[0] * self._width - (scale * (255 / 2))
             pos[1] = pos[1] * self._height - (scale * (255 / 2))
-            lines = self._convert_quickdraw_strokes_to_gizeh_group(strokes, color, stroke_width=stroke_width / scale)
-            lines = lines.scale(scale).translate(xy=pos)
-            lines.draw(self._surface)
+            self._draw_strokes(load, scale, pos, stroke_width, color, key)
         except ValueError as e:
             print(repr(e))
 
-    def draw_person(self, dataset, scale=1.0, position=[0, 0], stroke_width=6):
-        body_parts = {'face': [0, 0], 't-shirt': [0, 250], 'pants': [0, 480]}  # dict of parts + translation
-        gz_body_parts = []
-        for name, pos in body_parts.items():
-            strokes = dataset.get_drawing(name, random.randint(0, 99))
-            strokes_gz = self._convert_quickdraw_strokes_to_gizeh_group(strokes, stroke_width=stroke_width / scale)
-            strokes_gz = strokes_gz.translate(pos)
-            gz_body_parts.append(strokes_gz)
+    def draw_person(self, dataset, scale=1.0, position=[0, 0], stroke_width=6, parts=None):
+        """draw a person from a face, t-shirt and pants drawing.
+        The parts are composed into one drawing, which is cached like any other, so drawing the same
+        combination again (see person_template) costs one cache lookup.
+
+        :param parts: optional (name, index) pairs choosing the drawing of each body part, random otherwise
+        """
+        parts = dict(parts or ())
         scale *= np.mean([self._width, self._height]) / 750
-        pos[0] = position[0] * self._width - (scale * (255 / 2))
-        pos[1] = position[1] * self._height - (scale * (750 / 2))
-        gz_body_parts = gz.Group(gz_body_parts).scale(scale).translate(xy=pos)
-        gz_body_parts.draw(self._surface)
+        pos = [position[0] * self._width - (scale * (255 / 2)),
+               position[1] * self._height - (scale * (750 / 2))]
+        # parts keep the line width of a full height person whatever the person's size
+        stroke_width = stroke_width * np.mean([self._width, self._height]) / 750
+        selected = []
+        for name in self.PERSON_PARTS:
+            index = parts[name] if name in parts else self._pick_drawing(dataset, name)
+            selected.append((name,) + self._select_lod(dataset.get_drawing_lods(name, index), scale))
+
+        def compose():
+            return [np.asarray(stroke, dtype=np.float64) + np.reshape(self.PERSON_PARTS[name], (2, 1))
+                    for name, load, _ in selected for stroke in load()]
+        key = ('person',) + tuple(key for _, _, key in selected)
+        self._draw_strokes(compose, scale, pos, stroke_width, [0, 0, 0], key)
+
+    def person_template(self, dataset, rng=random):
+        """pick the body parts of a person from a pool of up to person_templates combinations.
+        New combinations are added until the pool is full, after that people reuse them.
+
+        :return: tuple of (name, index) pairs for draw_person
+        """
+        if len(self._person_templates) < self._person_templates_size:
+            template = tuple((name, self._pick_drawing(dataset, name, rng)) for name in self.PERSON_PARTS)
+            self._person_templates.append(template)
+            return template
+        return self._person_templates[rng.randrange(len(self._person_templates))]
+
+    def build_person_templates(self, dataset, scale=0.5):
+        """fill the person template pool up front and, once setup has been called, convert each template at
+        a typical person scale, so people drawn later do not pay for composing or converting their parts
+        """
+        while len(self._person_templates) < self._person_templates_size:
+            self.person_template(dataset)
+        if self._width is not None:
+            for template in self._person_templates:
+                self.draw_person(dataset, scale=scale, position=[0.5, 0.5], parts=template)
+            self.clear()
+
+    def _select_lod(self, strokes, scale):
+        """pick the level of detail of a drawing for scale canvas pixels per unit
+
+        :return: function returning the strokes, cache key (None for plain strokes, which are not cached)
+        """
+        if not hasattr(strokes, 'select_level'):
+            return (lambda: strokes), None
+        if self._coarsest_lod:
+            level = len(strokes) - 1
+        else:
+            level = strokes.select_level(scale * self._output_scale)
+        return (lambda: strokes[level]), strokes.key + (level,)
+
+    def _draw_strokes(self, load, scale, pos, stroke_width, color, key=None):
+        """draw dataset strokes scaled by scale canvas pixels per unit, with their origin at pos.
+        load returns the strokes, it is only called when their conversion is not cached under key.
+        """
+        # the unscaled points are cached, whatever the renderer, so a drawing at any scale or line width
+        # reuses them; only the cheap scaling and the renderer's own drawing are paid each time
+        points = self._cached(key, lambda: self._convert_quickdraw_strokes_to_arrays(load()))
+        polylines = [p * scale + pos for p in points]
+        if self._raster is not None:
+            self._raster.draw_polylines(polylines, stroke_width)
+        elif self._vector is not None:
+            self._vector.draw_polylines(polylines, stroke_width, color)
+        else:
+            self._arrays_to_gizeh_group(polylines, color, stroke_width).draw(self._surface)
+
+    def _cached(self, key, convert):
+        if key is None:
+            return convert()
+        value = self._stroke_cache.get(key)
+        if value is None:
+            value = self._stroke_cache[key] = convert()
+            if len(self._stroke_cache) > self._stroke_cache_size:
+                self._stroke_cache.popitem(last=False)
+        else:
+            self._stroke_cache.move_to_end(key)
+        return value
+
+    def _pick_drawing(self, dataset, name, rng=random):
+        return dataset.sample_drawing(name, rng=rng, **self._drawing_budget)
+
+    def _convert_quickdraw_strokes_to_arrays(self, strokes):
+        """convert quick draw (x, y) strokes into a list of Nx2 float arrays, building the whole drawing at once
+        """
+        if len(strokes) == 0:
+            return []
+        sizes = [len(stroke[0]) for stroke in strokes]
+        points = np.concatenate([np.asarray(stroke, dtype=np.float64) for stroke in strokes], axis=1).T
+        return np.split(points, np.cumsum(sizes)[:-1])
 
     def _convert_quickdraw_strokes_to_gizeh_group(self, strokes, color=[0, 0, 0], stroke_width=5):
-        lines_list = []
-        for stroke in strokes:
-            x, y = stroke
-            points = list(zip(x, y))
-            line = gz.polyline(points=points, stroke=color, stroke_width=stroke_width)
-            lines_list.append(line)
+        return self._arrays_to_gizeh_group(self._convert_quickdraw_strokes_to_arrays(strokes), color, stroke_width)
+
+    def _arrays_to_gizeh_group(self, polylines, color=[0, 0, 0], stroke_width=5):
+        lines_list = [gz.polyline(points=points, stroke=color, stroke_width=stroke_width) for points in polylines]
         return gz.Group(lines_list)
 
-    def draw_object_recognition_results(self, boxes, classes, scores, labels, dataset, threshold=0.5):
-        """draw results of object recognition
+    def prefetch_object_recognition_results(self, boxes, classes, scores, labels, dataset, threshold=0.5):
+        """start loading, in the background, the drawings draw_object_recognition_results will need
 
-        :return: list of objects drawn to the canvas
+        :return: list of futures from DrawingDataset.prefetch
         """
-        drawn_objects = []  # list of the objects drawn
+        names = []
+        for i in range(boxes.shape[0]):
+            if (scores is None or scores[i] >= threshold) and classes[i] in labels.keys():
+                class_name = labels[classes[i]]['name']
+                parts = self.PERSON_PARTS.keys() if class_name == 'person' else [class_name]
+                names.extend(name for name in parts if name not in names)
+        return dataset.prefetch(names)
+
+    def plan_object_recognition_results(self, boxes, classes, scores, labels, dataset, threshold=0.5, seed=None):
+        """decide what to draw for the results of object recognition, without drawing anything
+
+        :param seed: seeds the choice of drawings, so the same detections and seed give the same plan
+        :return: list of Placement
+        """
+        rng = random if seed is None else random.Random(seed)
+        placements = []
         for i in range(boxes.shape[0]):
             if scores is None or scores[i] >= threshold:
                 box = tuple(boxes[i].tolist())
                 if classes[i] in labels.keys():
                     class_name = labels[classes[i]]['name']
-                    drawn_objects.append(class_name)
                 else:
                     raise ValueError('no label for index {}'.format(i))
                 ymin, xmin, ymax, xmax = box
-                centre = [np.mean([xmin, xmax]), np.mean([ymin, ymax])]
-                size = np.mean([xmax - xmin, ymax - ymin])
+                centre = (float(np.mean([xmin, xmax])), float(np.mean([ymin, ymax])))
+                score = 1.0 if scores is None else float(scores[i])
                 if class_name == 'person':
-                    self.draw_person(dataset, scale=ymax - ymin, position=centre)
+                    drawings = self.person_template(dataset, rng)
+                    placements.append(Placement(class_name, drawings, centre, ymax - ymin, score))
+                else:
+                    drawings = ((class_name, self._pick_drawing(dataset, class_name, rng)),)
+                    size = float(np.mean([xmax - xmin, ymax - ymin]))
+                    placements.append(Placement(class_name, drawings, centre, size, score))
+        return placements
+
+    def layout(self, placements, iterations=50, padding=0.0, seed=0, width=1200, height=900):
+        """move planned placements apart so their drawings do not pile up, see layout.resolve_overlaps.
+        Uses the canvas size once setup has been called, width and height otherwise.
+        """
+        width = self._width or width
+        height = self._height or height
+        return resolve_overlaps(placements, width, height, iterations=iterations, padding=padding, seed=seed)
+
+    def render(self, placements, dataset, budget=None, degrade_after=0.5):
+        """draw planned placements on the canvas, highest score first
+
+        :param budget: optional time budget in seconds. Once degrade_after of it has been spent, remaining
+        objects are drawn at their coarsest level of detail; once all of it has been spent, they are skipped.
+        :return: RenderReport
+        """
+        start = time.perf_counter()
+        drawn_objects = []  # list of the objects drawn
+        degraded = []
+        skipped = []
+        try:
+            for placement in sorted(placements, key=lambda p: p.score, reverse=True):
+                if budget is not None:
+                    elapsed = time.perf_counter() - start
+                    if elapsed >= budget:
+                        skipped.append(placement)
+                        continue
+                    self._coarsest_lod = elapsed >= budget * degrade_after
+                if placement.class_name == 'person':
+                    self.draw_person(dataset, scale=placement.scale, position=list(placement.position),
+                                     parts=placement.drawings)
                 else:
-                    drawing = dataset.get_drawing(class_name, random.randint(0, 99))
-                    self.draw(drawing, scale=size, pos=centre)
-        return drawn_objects
+                    name, index = placement.drawings[0]
+                    self.draw(dataset.get_drawing_lods(name, index), scale=placement.scale,
+                              pos=list(placement.position))
+                (degraded if self._coarsest_lod else drawn_objects).append(placement.class_name)
+        finally:
+            self._coarsest_lod = False
+        return RenderReport(drawn_objects, degraded, skipped, time.perf_counter() - start)
+
+    def render_cached(self, placements, dataset, seed=None, budget=None):
+        """clear the canvas and render placements, or return the earlier result of an identical scene.
+        Keyed by placement_key of the placements, seed and canvas settings. Renders cut short by the
+        budget (see render) are not cached.
+
+        :return: RenderedSketch
+        """
+        key = placement_key(placements, seed, (self._renderer, self._width, self._height, self._output_scale))
+        sketch = self._render_cache.get(key)
+        if sketch is None:
+            self.clear()
+            report = self.render(placements, dataset, budget)
+            drawn_objects = report.drawn_objects + report.degraded
+            image = self.get_npimage()
+            if image.ndim == 3:
+                image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            png = cv2.imencode('.png', image)[1].tobytes()
+            if self._raster is not None:
+                width, height, bitmap = self._raster.get_bitmap()
+            else:
+                width, height, bitmap = pack_image(image)
+            bitmap = bytes(bitmap)
+            sketch = RenderedSketch(drawn_objects, width, height, bitmap, png)
+            if not report.degraded and not report.skipped:
+                self._render_cache.put(key, sketch)
+        return sketch
+
+    def draw_object_recognition_results(self, boxes, classes, scores, labels, dataset, threshold=0.5, budget=None):
+        """draw results of object recognition, plan_object_recognition_results followed by render
+
+        :param budget: optional render time budget in seconds, see render
+        :return: RenderReport, whose drawn_objects and degraded list the objects drawn to the canvas
+        """
+        placements = self.plan_object_recognition_results(boxes, classes, scores, labels, dataset, threshold)
+        return self.render(placements, dataset, budget)
 
     def get_npimage(self):
+        if self._vector is not None:
+            raise ValueError('the vector renderer has no image, use save_svg or save_pdf')
+        if self._raster is not None:
+            return self._raster.get_npimage()
         return self._surface.get_npimage()
 
+    def get_bitmap(self):
+        """printer ready bitmap, see RasterCanvas.get_bitmap. The gizeh surface is thresholded, rotated and
+        resized to the printer like printImage(image, rotate=True) would, see rastercanvas.pack_image.
+
+        :return: width, height, bitmap to pass to Adafruit_Thermal.printBitmap
+        """
+        if self._raster is not None:
+            return self._raster.get_bitmap()
+        if self._surface is None:
+            raise ValueError('get_bitmap needs the raster or gizeh renderer')
+        return pack_image(self._surface.get_npimage())
+
     def save_png(self, path):
-        self._surface.write_to_png(str(path))
\ No newline at end of file
+        if self._vector is not None:
+            raise ValueError('the vector renderer has no image, use save_svg or save_pdf')
+        if self._raster is not None:
+            self._raster.save_png(path)
+        else:
+            self._surface.write_to_png(str(path))
+
+    def save_svg(self, target, decimals=1):
+        """write the sketch as SVG, see VectorCanvas.write_svg. Needs the vector renderer.
+
+        :param target: path, or binary file object to stream to
+        :param decimals: decimal places kept of each coordinate, None to keep them all
+        """
+        if self._vector is None:
+            raise ValueError('save_svg needs the vector renderer')
+        self._vector.write_svg(target, decimals)
+
+    def save_pdf(self, target, decimals=1):
+        """write the sketch as a one page PDF, see VectorCanvas.write_pdf. Needs the vector renderer.
+
+        :param target: path, or binary file object to stream to
+        :param decimals: decimal places kept of each coordinate, None to keep them all
+        """
+        if self._vector is None:
+            raise ValueError('save_pdf needs the vector renderer')
+        self._vector.write_pdf(target, decimals)
+
+    def save_animation(self, path, fps=30, px_per_frame=25.0, scale=1.0, hold=1.0):
+        """write a video of the sketch being drawn stroke by stroke, in drawing order, see StrokeAnimator.
+        Needs the vector renderer; for an image sequence use StrokeAnimator.write_images.
+
+        :param px_per_frame: canvas pixels of stroke added per frame
+        :param scale: video pixels per canvas pixel
+        :param hold: seconds the finished sketch stays on screen at the end
+        :return: number of frames written
+        """
+        if self._vector is None:
+            raise ValueError('save_animation needs the vector renderer')
+        animator = StrokeAnimator(self._vector, px_per_frame=px_per_frame, scale=scale)
+        return animator.write_video(path, fps=fps, hold=hold)
\ No newline at end of file
@@ -0,0 +1,203 @@
+import numpy as np
+
+
+class VectorCanvas(object):
+    """canvas that keeps strokes as polylines and writes them out as SVG or PDF, with no rasterisation.
+
+    Polylines are stored as they are drawn, in canvas coordinates, and only formatted when written, one path
+    per draw call, straight to the file object. Coordinates are rounded to decimals places on the way out,
+    which at the default of 1 is far below what anyone can see and keeps files small.
+    """
+
+    def __init__(self, width=1200, height=900, bg_color=(1, 1, 1)):
+        self._width = width
+        self._height = height
+        self._bg_color = bg_color
+        self._paths = []
+
+    def clear(self, bg_color=None):
+        if bg_color is not None:
+            self._bg_color = bg_color
+        self._paths = []
+
+    def draw_polylines(self, polylines, stroke_width=6, color=(0, 0, 0)):
+        """draw a list of Nx2 canvas coordinate arrays as open polylines
+        """
+        polylines = [p for p in polylines if len(p)]
+        if polylines:
+            self._paths.append((float(stroke_width), tuple(color), polylines))
+
+    def write_svg(self, target, decimals=1):
+        """write the canvas as an SVG document
+
+        :param target: path, or binary file object to stream to
+        :param decimals: decimal places kept of each coordinate, None to keep them all
+        """
+        with _Output(target) as out:
+            out.write('<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{1}" viewBox="0 0 {0} {1}">'
+                      '<g fill="none" stroke-linecap="round" stroke-linejoin="round">'.format(
+                          _number(self._width), _number(self._height)))
+            if not _is_white(self._bg_color):
+                out.write('<rect width="100%" height="100%" fill="{}"/>'.format(_svg_color(self._bg_color)))
+            for width, color, polylines in self._paths:
+                out.write('<path stroke="{}" stroke-width="{}" d="'.format(_svg_color(color), _number(width)))
+                for points in polylines:
+                    # absolute move to the first point, then relative lines, which are shorter to write
+                    start, steps = _quantize(points, decimals)
+                    out.write('M{} {}'.format(*start))
+                    if len(steps):
+                        out.write('l' + ' '.join(steps))
+                    else:
+                        # a single point still leaves a dot with round caps, as in write_pdf
+                        out.write('l0 0')
+                out.write('"/>')
+            out.write('</g></svg>\n')
+
+    def write_pdf(self, target, decimals=1):
+        """write the canvas as a single page PDF document, one canvas pixel to a point
+
+        :param target: path, or binary file object to stream to. It does not need to be seekable.
+        :param decimals: decimal places kept of each coordinate, None to keep them all
+        """
+        with _Output(target) as out:
+            offsets = []
+
+            def begin_object():
+                offsets.append(out.tell())
+                out.write('{} 0 obj\n'.format(len(offsets)))
+
+            out.write('%PDF-1.4\n')
+            begin_object()
+            out.write('<</Type/Catalog/Pages 2 0 R>>\nendobj\n')
+            begin_object()
+            out.write('<</Type/Pages/Kids[3 0 R]/Count 1>>\nendobj\n')
+            begin_object()
+            out.write('<</Type/Page/Parent 2 0 R/MediaBox[0 0 {} {}]/Contents 4 0 R>>\nendobj\n'.format(
+                _number(self._width), _number(self._height)))
+            # the stream length is written as its own object after the stream, so nothing has to be buffered
+            begin_object()
+            out.write('<</Length 5 0 R>>\nstream\n')
+            start = out.tell()
+            # flip to the canvas' y down coordinates, round caps and joins like the other renderers
+            out.write('1 0 0 -1 0 {} cm 1 J 1 j\n'.format(_number(self._height)))
+            if not _is_white(self._bg_color):
+                out.write('{} rg 0 0 {} {} re f\n'.format(_pdf_color(self._bg_color), _number(self._width),
+                                                          _number(self._height)))
+            for width, color, polylines in self._paths:
+                out.write('{} RG {} w\n'.format(_pdf_color(color), _number(width)))
+                for points in polylines:
+                    points = _quantize_absolute(points, decimals)
+                    out.write('{} {} m\n'.format(*points[0]))
+                    if len(points) == 1:
+                        # a single point still leaves a dot with round caps
+                        out.write('{} {} l\n'.format(*points[0]))
+                    for x, y in points[1:]:
+                        out.write('{} {} l\n'.format(x, y))
+                    out.write('S\n')
+            length = out.tell() - start
+            out.write('endstream\nendobj\n')
+            begin_object()
+            out.write('{}\nendobj\n'.format(length))
+            xref = out.tell()
+            out.write('xref\n0 {}\n0000000000 65535 f \n'.format(len(offsets) + 1))
+            for offset in offsets:
+                out.write('{:010d} 00000 n \n'.format(offset))
+            out.write('trailer\n<</Size {}/Root 1 0 R>>\nstartxref\n{}\n%%EOF\n'.format(len(offsets) + 1, xref))
+
+    @property
+    def paths(self):
+        """(stroke_width, color, polylines) of every draw call, in drawing order"""
+        return self._paths
+
+    @property
+    def size(self):
+        return self._width, self._height
+
+    @property
+    def bg_color(self):
+        return self._bg_color
+
+    def __len__(self):
+        """number of polylines drawn"""
+        return sum(len(polylines) for _, _, polylines in self._paths)
+
+
+class _Output(object):
+    """writes text as ASCII to a path or binary file object, counting the bytes written"""
+
+    def __init__(self, target):
+        self._target = target
+        self._file = None
+        self._written = 0
+
+    def __enter__(self):
+        if hasattr(self._target, 'write'):
+            self._file = self._target
+        else:
+            self._file = open(str(self._target), 'wb')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._file is not self._target:
+            self._file.close()
+
+    def write(self, text):
+        data = text.encode('ascii')
+        self._file.write(data)
+        self._written += len(data)
+
+    def tell(self):
+        return self._written
+
+
+def _number(value):
+    return '{:g}'.format(value)
+
+
+def _quantize_absolute(points, decimals):
+    """points as (x, y) string pairs, rounded to decimals places"""
+    if decimals is None:
+        return [tuple(repr(float(v)) for v in point) for point in np.asarray(points, dtype=np.float64)]
+    fixed = _fixed(points, decimals)
+    return [(_decimal(x, decimals), _decimal(y, decimals)) for x, y in fixed.tolist()]
+
+
+def _quantize(points, decimals):
+    """first point and the relative steps to the following ones, as strings, rounded to decimals places.
+    Points are rounded before taking differences, so rounding errors do not add up along the stroke.
+    """
+    if decimals is None:
+        points = np.asarray(points, dtype=np.float64)
+        steps = np.diff(points, axis=0)
+        return tuple(repr(float(v)) for v in points[0]), [repr(float(v)) for v in steps.ravel()]
+    fixed = _fixed(points, decimals)
+    steps = np.diff(fixed, axis=0).ravel()
+    return tuple(_decimal(v, decimals) for v in fixed[0].tolist()), [_decimal(v, decimals) for v in steps.tolist()]
+
+
+def _fixed(points, decimals):
+    """points as whole multiples of 10 ** -decimals, so differences between them are exact"""
+    return np.round(np.asarray(points, dtype=np.float64) * 10 ** decimals).astype(np.int64)
+
+
+def _decimal(value, decimals):
+    """shortest decimal string of the fixed point value"""
+    if decimals == 0:
+        return str(value)
+    whole, fraction = divmod(abs(value), 10 ** decimals)
+    sign = '-' if value < 0 else ''
+    if fraction == 0:
+        return sign + str(whole)
+    return '{}{}.{}'.format(sign, whole, str(fraction).rjust(decimals, '0').rstrip('0'))
+
+
+def _is_white(color):
+    return color is None or all(c >= 1 for c in color[:3])
+
+
+def _svg_color(color):
+    return '#{:02x}{:02x}{:02x}'.format(*(int(round(255 * min(max(c, 0), 1))) for c in color[:3]))
+
+
+def _pdf_color(color):
+    return ' '.join(_number(round(min(max(c, 0), 1), 3)) for c in color[:3])